@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Localización compartida de la automatización de TradingView
+Usado por trading_system_calude_ai.py y trading_system_no_mt5.py
+"""
+
+import importlib
+import importlib.util
+
+AUTOMATION_CANDIDATES = (
+    ('trading_bot', 'TradingViewAutomation'),
+    ('Trading_bot', 'TradingViewAutomation'),
+    ('tradingview_automation', 'TradingViewAutomation')
+)
+
+# Set on the first successful lookup; misses are retried on the next call
+_automation_class = None
+
+def resolve_automation_class():
+    """Locate the TradingView automation class; find_spec skips misses without importing"""
+    global _automation_class
+    if _automation_class is not None:
+        return _automation_class
+
+    for module_name, class_name in AUTOMATION_CANDIDATES:
+        if importlib.util.find_spec(module_name) is None:
+            continue
+        try:
+            _automation_class = getattr(importlib.import_module(module_name), class_name)
+            return _automation_class
+        except (ImportError, AttributeError):
+            continue
+    return None
@@ -5,8 +5,12 @@ Conecta el sistema de trading con Claude API para análisis automático
 """
 
 import os
+import io
+import re
 import json
-import base64
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 import logging
@@ -14,41 +18,49 @@ from typing import Dict, List, Any, Optional
 
 try:
     import anthropic
+    import httpx
 except ImportError:
     print("❌ Error: pip3 install anthropic")
     exit(1)
 
-class ClaudeTrader:
-    def __init__(self, api_key: str = None):
-        """Initialize Claude Trader with API key"""
-        self.api_key = api_key or "sk-ant-REDACTED"
-        
-        # Initialize Anthropic client
-        self.client = anthropic.Anthropic(api_key=self.api_key)
-        
-        # Setup logging
-        self.logger = logging.getLogger("ClaudeTrader")
-        self.logger.setLevel(logging.INFO)
-        
-        if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
-    
-    def encode_image(self, image_path: str) -> str:
-        """Encode image to base64 for Claude API"""
-        try:
-            with open(image_path, "rb") as image_file:
-                encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
-            return encoded_string
-        except Exception as e:
-            self.logger.error(f"❌ Error encoding image {image_path}: {e}")
-            return None
-    
-    def create_trading_prompt(self, memory_context: str) -> str:
-        """Create comprehensive trading prompt for Claude"""
-        return f"""Eres un trader profesional experto analizando el mercado EURUSD. 
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for base64
+except ImportError:
+    import base64
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+# API key is read once from the environment (never hard-code it in source)
+DEFAULT_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
+
+# Screenshots are downscaled to this long edge and re-encoded as JPEG
+MAX_IMAGE_EDGE = 1280
+JPEG_QUALITY = 70
+IMAGE_MEDIA_TYPE = "image/jpeg" if Image else "image/png"
+
+# Timeframes are stitched into one 2x2 composite to cut vision tokens
+COMPOSITE_TILE_SIZE = (768, 512)
+COMPOSITE_LAYOUT = (("H4", (0, 0)), ("H1", (768, 0)), ("M15", (0, 512)))
+COMPOSITE_PROMPT_NOTE = (
+    "Las capturas H4, H1 y M15 se envían en una sola imagen compuesta: "
+    "H4 arriba a la izquierda, H1 arriba a la derecha, M15 abajo a la izquierda.\n\n"
+)
+
+# Analysis log is JSON Lines; trimmed to the last entries once it grows past the size cap
+ANALYSIS_LOG_FILE = Path("claude_trading_log.jsonl")
+ANALYSIS_LOG_MAX_ENTRIES = 100
+ANALYSIS_LOG_MAX_BYTES = 1024 * 1024
+
+# Static trading methodology, sent as the system prompt
+TRADING_SYSTEM_PROMPT = """Eres un trader profesional experto analizando el mercado EURUSD. 
 
 ANÁLISIS REQUERIDO:
 Analiza las 3 capturas de pantalla proporcionadas (H4, H1, M15) siguiendo esta metodología:
@@ -68,9 +80,6 @@ Analiza las 3 capturas de pantalla proporcionadas (H4, H1, M15) siguiendo esta m
    - ¿Es buen momento para entrar o esperar retroceso?
    - ¿Hay confluencia con niveles superiores?
 
-MEMORIA DE LECCIONES APRENDIDAS:
-{memory_context}
-
 REGLAS ESTRICTAS:
 - NO operar sin estructura clara en H4
 - NO comprar techos ni vender suelos sin retroceso
@@ -85,7 +94,7 @@ DECISIONES DISPONIBLES:
 
 FORMATO DE RESPUESTA REQUERIDO:
 Responde EXACTAMENTE en este formato JSON:
-{{
+{
     "decision": "X",
     "reasoning": "Explica tu análisis detallado aquí",
     "confidence": X,
@@ -93,7 +102,7 @@ Responde EXACTAMENTE en este formato JSON:
     "h1_analysis": "Tu análisis del H1", 
     "m15_analysis": "Tu análisis del M15",
     "risk_assessment": "Evaluación de riesgo"
-}}
+}
 
 Donde:
 - decision: Solo el número 1, 2, 3 o 4
@@ -102,8 +111,139 @@ Donde:
 
 IMPORTANTE: Responde SOLO con el JSON, sin texto adicional."""
 
+# Per-call part of the prompt; only the memory context varies
+MEMORY_PROMPT_HEADER = "MEMORIA DE LECCIONES APRENDIDAS:\n"
+
+# Decision schema checked by _validate_decision
+REQUIRED_DECISION_FIELDS = ("decision", "reasoning", "confidence")
+VALID_DECISIONS = frozenset({"1", "2", "3", "4"})
+
+# Extracts the JSON body from a markdown code fence in Claude's reply
+JSON_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+def _json_loads(text: str) -> Any:
+    """Parse JSON with orjson when available"""
+    return orjson.loads(text) if orjson else json.loads(text)
+
+def _json_line(data: Any) -> bytes:
+    """Serialize one JSON Lines record as UTF-8 bytes"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode('utf-8')
+
+@functools.lru_cache(maxsize=None)
+def _get_client(api_key: str) -> "anthropic.Anthropic":
+    """Shared Anthropic client per API key, keeping TLS connections alive between calls"""
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=300)
+    )
+    return anthropic.Anthropic(api_key=api_key, http_client=http_client)
+
+@functools.lru_cache(maxsize=4)
+def _composite_images(tiles: tuple) -> bytes:
+    """Stitch (timeframe, path, mtime) tiles into one labelled JPEG composite"""
+    tile_w, tile_h = COMPOSITE_TILE_SIZE
+    canvas = Image.new("RGB", (tile_w * 2, tile_h * 2), "white")
+    draw = ImageDraw.Draw(canvas)
+    positions = dict(COMPOSITE_LAYOUT)
+    
+    for tf, image_path, _mtime in tiles:
+        with Image.open(image_path) as img:
+            img = img.convert("RGB")
+            img.thumbnail(COMPOSITE_TILE_SIZE, Image.LANCZOS)
+            canvas.paste(img, positions[tf])
+        x, y = positions[tf]
+        draw.text((x + 8, y + 8), tf, fill="red")
+    
+    buffer = io.BytesIO()
+    canvas.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+@functools.lru_cache(maxsize=16)
+def _compress_image(image_path: str, mtime: float) -> bytes:
+    """Downscale and JPEG-encode a screenshot (cached by path and mtime)"""
+    if Image is None:
+        with open(image_path, "rb") as image_file:
+            return image_file.read()
+    
+    with Image.open(image_path) as img:
+        img = img.convert("RGB")
+        img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+class ClaudeTrader:
+    def __init__(self, api_key: str = None):
+        """Initialize Claude Trader with API key"""
+        self.api_key = api_key or DEFAULT_API_KEY
+        if not self.api_key:
+            raise RuntimeError("ANTHROPIC_API_KEY is not set")
+        
+        # Usage of the last API response
+        self.last_usage = None
+        
+        # Setup logging
+        self.logger = logging.getLogger("ClaudeTrader")
+        self.logger.setLevel(logging.INFO)
+        
+        if not self.logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            self.logger.addHandler(handler)
+    
+    @functools.cached_property
+    def client(self) -> "anthropic.Anthropic":
+        """Shared Anthropic client (pooled connections), created on first API use"""
+        return _get_client(self.api_key)
+    
+    def encode_image(self, image_path: str) -> str:
+        """Compress and encode image to base64 for Claude API"""
+        try:
+            mtime = os.stat(image_path).st_mtime
+            encoded_string = base64.b64encode(_compress_image(str(image_path), mtime)).decode('ascii')
+            return encoded_string
+        except Exception as e:
+            self.logger.error(f"❌ Error encoding image {image_path}: {e}")
+            return None
+    
+    def encode_composite(self, screenshots: Dict[str, str]) -> Optional[str]:
+        """Encode H4/H1/M15 screenshots as a single base64 composite image"""
+        if Image is None:
+            return None
+        
+        try:
+            tiles = tuple(
+                (tf, str(screenshots[tf]), os.stat(screenshots[tf]).st_mtime)
+                for tf, _ in COMPOSITE_LAYOUT if tf in screenshots
+            )
+            if not tiles:
+                return None
+            return base64.b64encode(_composite_images(tiles)).decode('ascii')
+        except Exception as e:
+            self.logger.error(f"❌ Error building composite image: {e}")
+            return None
+    
+    def _image_block(self, encoded_image: str) -> Dict[str, Any]:
+        """Build a base64 image content block for the Claude API"""
+        return {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": IMAGE_MEDIA_TYPE,
+                "data": encoded_image
+            }
+        }
+    
+    def create_trading_prompt(self, memory_context: str) -> str:
+        """Create the per-call part of the trading prompt (methodology lives in the system prompt)"""
+        return MEMORY_PROMPT_HEADER + memory_context
+
     def analyze_market(self, screenshots: Dict[str, str], memory_context: str) -> Dict[str, Any]:
         """Send analysis request to Claude API"""
+        # Fallback decisions must not be logged with the previous call's usage
+        self.last_usage = None
         try:
             self.logger.info("🤖 Sending analysis to Claude API...")
             
@@ -111,20 +251,25 @@ IMPORTANTE: Responde SOLO con el JSON, sin texto adicional."""
             images = []
             timeframe_order = ["H4", "H1", "M15"]
             
-            for tf in timeframe_order:
-                if tf in screenshots:
-                    image_path = screenshots[tf]
-                    encoded_image = self.encode_image(image_path)
+            # One composite costs far fewer vision tiles than three full screenshots
+            composite = self.encode_composite(screenshots)
+            
+            if composite:
+                images.append(self._image_block(composite))
+                self.logger.info("📸 Added H4/H1/M15 composite to analysis")
+            else:
+                # Encode all timeframes concurrently (disk I/O + Pillow/base64 release the GIL)
+                with ThreadPoolExecutor(max_workers=len(timeframe_order)) as executor:
+                    futures = {
+                        tf: executor.submit(self.encode_image, screenshots[tf])
+                        for tf in timeframe_order if tf in screenshots
+                    }
+                
+                for tf, future in futures.items():
+                    encoded_image = future.result()
                     
                     if encoded_image:
-                        images.append({
-                            "type": "image",
-                            "source": {
-                                "type": "base64",
-                                "media_type": "image/png",
-                                "data": encoded_image
-                            }
-                        })
+                        images.append(self._image_block(encoded_image))
                         self.logger.info(f"📸 Added {tf} screenshot to analysis")
                     else:
                         self.logger.error(f"❌ Failed to encode {tf} screenshot")
@@ -135,6 +280,8 @@ IMPORTANTE: Responde SOLO con el JSON, sin texto adicional."""
             
             # Create prompt
             trading_prompt = self.create_trading_prompt(memory_context)
+            if composite:
+                trading_prompt = COMPOSITE_PROMPT_NOTE + trading_prompt
             
             # Prepare message content
             message_content = []
@@ -151,29 +298,37 @@ IMPORTANTE: Responde SOLO con el JSON, sin texto adicional."""
             # Send to Claude API
             self.logger.info(f"📤 Sending request to Claude with {len(images)} images...")
             
-            response = self.client.messages.create(
+            # Stream the reply so first-token latency is visible and text is collected as it arrives
+            chunks = []
+            with self.client.messages.stream(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=1000,
                 temperature=0.1,  # Low temperature for consistent trading decisions
+                system=TRADING_SYSTEM_PROMPT,
                 messages=[{
                     "role": "user",
                     "content": message_content
                 }]
-            )
+            ) as stream:
+                for text in stream.text_stream:
+                    if not chunks:
+                        self.logger.info("⚡ First tokens received from Claude")
+                    chunks.append(text)
+                response = stream.get_final_message()
             
             # Parse response
-            response_text = response.content[0].text.strip()
+            self.last_usage = getattr(response, "usage", None)
+            response_text = "".join(chunks).strip()
             self.logger.info("✅ Received response from Claude")
             
             # Try to parse JSON response
             try:
                 # Clean response if it has markdown formatting
-                if "```json" in response_text:
-                    response_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif "```" in response_text:
-                    response_text = response_text.split("```")[1].strip()
+                fence_match = JSON_FENCE_RE.search(response_text)
+                if fence_match:
+                    response_text = fence_match.group(1).strip()
                 
-                decision_data = json.loads(response_text)
+                decision_data = _json_loads(response_text)
                 
                 # Validate decision format
                 if not self._validate_decision(decision_data):
@@ -193,26 +348,27 @@ IMPORTANTE: Responde SOLO con el JSON, sin texto adicional."""
     
     def _validate_decision(self, decision_data: Dict) -> bool:
         """Validate Claude's decision format"""
-        required_fields = ["decision", "reasoning", "confidence"]
-        
-        for field in required_fields:
+        for field in REQUIRED_DECISION_FIELDS:
             if field not in decision_data:
                 self.logger.error(f"❌ Missing field: {field}")
                 return False
         
         # Validate decision value
-        if decision_data["decision"] not in ["1", "2", "3", "4"]:
+        if decision_data["decision"] not in VALID_DECISIONS:
             self.logger.error(f"❌ Invalid decision: {decision_data['decision']}")
             return False
         
-        # Validate confidence
-        try:
-            confidence = int(decision_data["confidence"])
-            if not 1 <= confidence <= 10:
-                self.logger.error(f"❌ Invalid confidence: {confidence}")
+        # Validate confidence (Claude usually emits an int already)
+        confidence = decision_data["confidence"]
+        if type(confidence) is not int:
+            try:
+                confidence = int(confidence)
+            except (ValueError, TypeError):
+                self.logger.error("❌ Invalid confidence format")
                 return False
-        except (ValueError, TypeError):
-            self.logger.error("❌ Invalid confidence format")
+        
+        if not 1 <= confidence <= 10:
+            self.logger.error(f"❌ Invalid confidence: {confidence}")
             return False
         
         return True
@@ -233,45 +389,52 @@ IMPORTANTE: Responde SOLO con el JSON, sin texto adicional."""
     def save_analysis_log(self, screenshots: Dict[str, str], decision_data: Dict[str, Any]):
         """Save analysis log for review"""
         try:
+            output_tokens = getattr(self.last_usage, "output_tokens", None)
             log_data = {
                 "timestamp": datetime.now().isoformat(),
                 "screenshots": screenshots,
                 "claude_analysis": decision_data,
                 "api_usage": {
                     "model": "claude-3-5-sonnet-20241022",
-                    "tokens_estimated": len(str(decision_data)) * 4  # Rough estimate
+                    "output_tokens": output_tokens
                 }
             }
             
-            log_file = Path("claude_trading_log.json")
-            
-            # Load existing logs
-            if log_file.exists():
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            # Add new log
-            logs.append(log_data)
+            # Append one record per line (O(1) instead of rewriting the whole log)
+            with open(ANALYSIS_LOG_FILE, 'ab') as f:
+                f.write(_json_line(log_data))
+                log_size = f.tell()
             
-            # Keep only last 100 analyses
-            logs = logs[-100:]
+            # Keep only the last 100 analyses once the file outgrows the cap
+            # (the size lives on disk, so the check survives restarts and instances)
+            if log_size > ANALYSIS_LOG_MAX_BYTES:
+                self._trim_analysis_log()
             
-            # Save updated logs
-            with open(log_file, 'w', encoding='utf-8') as f:
-                json.dump(logs, f, indent=2, ensure_ascii=False)
-            
-            self.logger.info(f"📝 Analysis log saved ({len(logs)} total)")
+            self.logger.info(f"📝 Analysis log saved: {ANALYSIS_LOG_FILE}")
             
         except Exception as e:
             self.logger.error(f"❌ Error saving analysis log: {e}")
+    
+    def _trim_analysis_log(self):
+        """Rewrite the analysis log keeping only the most recent entries"""
+        with open(ANALYSIS_LOG_FILE, 'rb') as f:
+            recent = deque(f, maxlen=ANALYSIS_LOG_MAX_ENTRIES)
+        
+        # Write aside and rename so a crash mid-write can't truncate the log
+        temp_path = ANALYSIS_LOG_FILE.with_suffix('.tmp')
+        try:
+            with open(temp_path, 'wb') as f:
+                f.writelines(recent)
+            os.replace(temp_path, ANALYSIS_LOG_FILE)
+        except OSError:
+            temp_path.unlink(missing_ok=True)
+            raise
 
 def test_claude_connection():
     """Test Claude API connection"""
-    trader = ClaudeTrader()
-    
     try:
+        trader = ClaudeTrader()
+        
         # Simple test message
         response = trader.client.messages.create(
             model="claude-3-5-sonnet-20241022",
@@ -299,4 +462,4 @@ if __name__ == "__main__":
         print("✅ Claude API ready for trading!")
     else:
         print("❌ Claude API connection failed!")
-        print("Check your API key and internet connection.")
+        print("Check ANTHROPIC_API_KEY and your internet connection.")
@@ -6,31 +6,208 @@ Manages lessons in local JSON file with enhanced error handling and features
 
 import json
 import os
+import re
+import sys
+import time
+import mmap
+import copy
+import heapq
+from collections import Counter
+from itertools import islice
+from operator import itemgetter
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 import logging
 import shutil
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Silent unless the application configures logging (see configure_logging)
+logger = logging.getLogger("TradingMemory")
+logger.addHandler(logging.NullHandler())
+
+# Seed lessons written when no memory file exists yet
+INITIAL_LESSONS = (
+    {
+        "id": "L001",
+        "date": "2024-12-15",
+        "pair": "EURUSD",
+        "type": "Estructura",
+        "context": "H4 lateral sin dirección clara, sin HH/HL definidos",
+        "rule": "No operar si H4 no muestra estructura cristalina - evitar rangos",
+        "result": "WAIT",
+        "relevance": 5,
+        "tags": ["estructura", "h4", "lateral"]
+    },
+    {
+        "id": "L002", 
+        "date": "2024-12-16",
+        "pair": "EURUSD",
+        "type": "Timing",
+        "context": "Estructura bullish OK pero precio en resistencia histórica",
+        "rule": "No comprar techos sin zona de demanda clara - esperar retroceso",
+        "result": "WAIT",
+        "relevance": 4,
+        "tags": ["timing", "resistencia", "entry"]
+    },
+    {
+        "id": "L003",
+        "date": "2024-12-17",
+        "pair": "EURUSD",
+        "type": "Setup Completo",
+        "context": "H4 bullish + H1 break estructura + M15 order block",
+        "rule": "Cascada completa = alta probabilidad de éxito",
+        "result": "+22 pips",
+        "relevance": 5,
+        "tags": ["cascada", "order_block", "win"]
+    },
+    {
+        "id": "L004",
+        "date": "2024-12-18",
+        "pair": "EURUSD",
+        "type": "Risk Management",
+        "context": "Trade ganador, movió SL a BE prematuramente",
+        "rule": "Dejar correr winners - SL a BE solo después de 1:1 RR",
+        "result": "BE (podría haber sido +30)",
+        "relevance": 4,
+        "tags": ["risk_management", "sl", "be"]
+    },
+    {
+        "id": "L005",
+        "date": "2024-12-19",
+        "pair": "EURUSD",
+        "type": "Zona Rota",
+        "context": "Order block identificado pero precio lo rompió violentamente",
+        "rule": "No forzar trades cuando zona falla - respetar el mercado",
+        "result": "WAIT",
+        "relevance": 5,
+        "tags": ["order_block", "zona_rota", "discipline"]
+    },
+    {
+        "id": "L006",
+        "date": "2024-12-20",
+        "pair": "EURUSD",
+        "type": "Sistema",
+        "context": "Memoria evitó repetir error de timing en resistencia",
+        "rule": "Sistema de memoria funciona para evitar errores recurrentes",
+        "result": "No Loss",
+        "relevance": 5,
+        "tags": ["memoria", "sistema", "avoided_loss"]
+    }
+)
+
+# Snapshots above this size are parsed straight from a read-only mmap
+MMAP_THRESHOLD = 64 * 1024
+
+# Fold the lesson journal into the snapshot once it grows past this size
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# Signed pip result inside a lesson's result text, e.g. "+22 pips"
+_PIP_RE = re.compile(r'([+-])(\d+(?:\.\d+)?)\s*pip')
+
+# At most one automatic backup per this many seconds (taken before a full save)
+BACKUP_INTERVAL_SECONDS = 3600
+BACKUP_PREFIX = "trading_memory_backup_"
+
+# Column order for CSV exports (tags are appended when requested)
+CSV_FIELDS = ("id", "date", "pair", "type", "context", "rule", "result", "relevance")
+
+def configure_logging(level: int = logging.INFO):
+    """Opt-in console output for memory operations"""
+    logger.setLevel(level)
+    if not any(isinstance(handler, logging.StreamHandler) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+
+def _json_loads(data: bytes) -> Any:
+    """Parse JSON with orjson when available"""
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def _json_dumps(data: Any) -> bytes:
+    """Serialize the memory snapshot as UTF-8 bytes"""
+    if orjson:
+        # stdlib json accepts int keys (e.g. relevance histograms); keep parity
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    # Compact, ASCII-escaped output: no pretty-print whitespace to write or re-read
+    return json.dumps(data, separators=(",", ":")).encode('ascii')
+
+def _json_line(data: Any) -> bytes:
+    """Serialize one journal record as a UTF-8 JSON line"""
+    if orjson:
+        return orjson.dumps(data, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode('utf-8')
+
+def _intern_lesson(lesson: Dict[str, Any]):
+    """Share one string object per distinct pair/type/date/tag across lessons"""
+    for key in ("pair", "type", "date"):
+        value = lesson.get(key)
+        if isinstance(value, str):
+            lesson[key] = sys.intern(value)
+    tags = lesson.get("tags")
+    if isinstance(tags, list):
+        lesson["tags"] = [sys.intern(tag) if isinstance(tag, str) else tag for tag in tags]
+
+def _clone_file(src: Path, dst: Path):
+    """Snapshot src at dst: hardlink, else copy_file_range (reflinks on CoW filesystems), else copy2"""
+    # Never write through an existing dst: it may be a hardlink sharing src's inode
+    dst.unlink(missing_ok=True)
+    try:
+        # Safe because the memory file is only ever replaced by rename, never rewritten in place
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    
+    shutil.copy2(src, dst)
+
 class LocalTradingMemory:
     def __init__(self, memory_file: str = "trading_memory.json", backup_enabled: bool = True):
         """Initialize local memory system with enhanced features"""
         self.memory_file = memory_file
         self.backup_enabled = backup_enabled
+        # Time of the newest backup; read lazily from the backup file names
+        self._last_backup_ts: Optional[float] = None
         
-        # ✅ IMPROVED: Flexible storage location
-        self.memory_path = self._get_memory_path()
-        self.backup_dir = self.memory_path.parent / "backups"
+        # Bumped on every save so callers can cache derived views
+        self.version = 0
+        
+        # Parsed memory, reused until the file's (mtime_ns, size) or the journal size changes
+        self._memory: Optional[Dict[str, Any]] = None
+        self._memory_key = None
+        
+        # relevance -> [(date, -position, lesson)], newest first
+        self._by_relevance: Dict[Any, List[tuple]] = {}
         
-        # Setup logging
-        self._setup_logging()
+        # field -> (lowercased texts, trigram -> positions), valid for one lessons list/version
+        self._search_index: Dict[str, tuple] = {}
+        self._search_key = None
+        
+        # ✅ IMPROVED: Flexible storage location
+        self._use_memory_path(self._get_memory_path())
         
         # Initialize memory
         self.ensure_memory_file()
-        
-        # Create backup if enabled
-        if self.backup_enabled:
-            self._create_backup()
+        self._compact_journal()
     
     def _get_memory_path(self) -> Path:
         """Get appropriate memory file path based on environment"""
@@ -42,27 +219,21 @@ class LocalTradingMemory:
         if current_dir.exists():
             return current_dir
         
-        # If current directory is writable, use it
-        try:
-            test_file = Path.cwd() / ".test_write"
-            test_file.touch()
-            test_file.unlink()
+        # If current directory is writable, use it (one access() call, no probe file)
+        if os.access(Path.cwd(), os.W_OK):
             return current_dir
-        except (PermissionError, OSError):
-            self.logger.warning("Current directory not writable, using Desktop")
-            return desktop_dir
-    
-    def _setup_logging(self):
-        """Setup logging for memory operations"""
-        self.logger = logging.getLogger("TradingMemory")
-        self.logger.setLevel(logging.INFO)
-        
-        # Console handler
-        if not self.logger.handlers:
-            handler = logging.StreamHandler()
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            self.logger.addHandler(handler)
+        
+        logger.warning("Current directory not writable, using Desktop")
+        return desktop_dir
+    
+    def _use_memory_path(self, memory_path: Path):
+        """Point the memory file, its journal and backups at memory_path"""
+        self.memory_path = memory_path
+        # New lessons are appended here and folded into memory_path on full saves
+        self.journal_path = memory_path.with_suffix('.jsonl')
+        self.backup_dir = memory_path.parent / "backups"
+        self._memory = None
+        self._memory_key = None
     
     def _create_backup(self):
         """Create automatic backup of memory file"""
@@ -75,104 +246,53 @@ class LocalTradingMemory:
             
             # Create timestamped backup
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_file = self.backup_dir / f"trading_memory_backup_{timestamp}.json"
+            backup_file = self.backup_dir / f"{BACKUP_PREFIX}{timestamp}.json"
             
-            shutil.copy2(self.memory_path, backup_file)
+            _clone_file(self.memory_path, backup_file)
+            self._last_backup_ts = time.time()
             
             # Keep only last 10 backups
             self._cleanup_old_backups()
             
-            self.logger.info(f"Backup created: {backup_file}")
+            logger.info(f"Backup created: {backup_file}")
             
         except Exception as e:
-            self.logger.error(f"Failed to create backup: {e}")
+            logger.error(f"Failed to create backup: {e}")
+    
+    def _backup_due(self) -> bool:
+        """True when the newest backup is older than BACKUP_INTERVAL_SECONDS"""
+        if self._last_backup_ts is None:
+            self._last_backup_ts = 0.0
+            # Timestamped names sort chronologically, so this survives restarts without stats
+            newest = max(self.backup_dir.glob(f"{BACKUP_PREFIX}*.json"), default=None)
+            if newest is not None:
+                try:
+                    stamp = newest.stem[len(BACKUP_PREFIX):]
+                    self._last_backup_ts = datetime.strptime(stamp, "%Y%m%d_%H%M%S").timestamp()
+                except ValueError:
+                    pass
+        
+        return time.time() - self._last_backup_ts > BACKUP_INTERVAL_SECONDS
     
     def _cleanup_old_backups(self, keep_count: int = 10):
         """Keep only the most recent backups"""
         try:
-            backup_files = list(self.backup_dir.glob("trading_memory_backup_*.json"))
+            backup_files = list(self.backup_dir.glob(f"{BACKUP_PREFIX}*.json"))
             backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
             
             # Remove old backups
             for old_backup in backup_files[keep_count:]:
                 old_backup.unlink()
-                self.logger.info(f"Removed old backup: {old_backup}")
+                logger.info(f"Removed old backup: {old_backup}")
                 
         except Exception as e:
-            self.logger.error(f"Failed to cleanup backups: {e}")
+            logger.error(f"Failed to cleanup backups: {e}")
     
     def ensure_memory_file(self):
         """Create memory file if it doesn't exist with improved initial data"""
         if not self.memory_path.exists():
             # ✅ IMPROVED: Better initial lessons with timestamps
-            initial_lessons = [
-                {
-                    "id": "L001",
-                    "date": "2024-12-15",
-                    "pair": "EURUSD",
-                    "type": "Estructura",
-                    "context": "H4 lateral sin dirección clara, sin HH/HL definidos",
-                    "rule": "No operar si H4 no muestra estructura cristalina - evitar rangos",
-                    "result": "WAIT",
-                    "relevance": 5,
-                    "tags": ["estructura", "h4", "lateral"]
-                },
-                {
-                    "id": "L002", 
-                    "date": "2024-12-16",
-                    "pair": "EURUSD",
-                    "type": "Timing",
-                    "context": "Estructura bullish OK pero precio en resistencia histórica",
-                    "rule": "No comprar techos sin zona de demanda clara - esperar retroceso",
-                    "result": "WAIT",
-                    "relevance": 4,
-                    "tags": ["timing", "resistencia", "entry"]
-                },
-                {
-                    "id": "L003",
-                    "date": "2024-12-17",
-                    "pair": "EURUSD",
-                    "type": "Setup Completo",
-                    "context": "H4 bullish + H1 break estructura + M15 order block",
-                    "rule": "Cascada completa = alta probabilidad de éxito",
-                    "result": "+22 pips",
-                    "relevance": 5,
-                    "tags": ["cascada", "order_block", "win"]
-                },
-                {
-                    "id": "L004",
-                    "date": "2024-12-18",
-                    "pair": "EURUSD",
-                    "type": "Risk Management",
-                    "context": "Trade ganador, movió SL a BE prematuramente",
-                    "rule": "Dejar correr winners - SL a BE solo después de 1:1 RR",
-                    "result": "BE (podría haber sido +30)",
-                    "relevance": 4,
-                    "tags": ["risk_management", "sl", "be"]
-                },
-                {
-                    "id": "L005",
-                    "date": "2024-12-19",
-                    "pair": "EURUSD",
-                    "type": "Zona Rota",
-                    "context": "Order block identificado pero precio lo rompió violentamente",
-                    "rule": "No forzar trades cuando zona falla - respetar el mercado",
-                    "result": "WAIT",
-                    "relevance": 5,
-                    "tags": ["order_block", "zona_rota", "discipline"]
-                },
-                {
-                    "id": "L006",
-                    "date": "2024-12-20",
-                    "pair": "EURUSD",
-                    "type": "Sistema",
-                    "context": "Memoria evitó repetir error de timing en resistencia",
-                    "rule": "Sistema de memoria funciona para evitar errores recurrentes",
-                    "result": "No Loss",
-                    "relevance": 5,
-                    "tags": ["memoria", "sistema", "avoided_loss"]
-                }
-            ]
+            initial_lessons = copy.deepcopy(list(INITIAL_LESSONS))
             
             initial_data = {
                 "lessons": initial_lessons,
@@ -184,14 +304,30 @@ class LocalTradingMemory:
                 }
             }
             
-            self.save_memory(initial_data)
-            self.logger.info(f"Memory file created: {self.memory_path}")
+            try:
+                self.save_memory(initial_data)
+            except PermissionError:
+                # access() said writable but the real write was refused: fall back to Desktop
+                desktop_path = Path.home() / "Desktop" / self.memory_file
+                if self.memory_path == desktop_path:
+                    raise
+                logger.warning("Current directory not writable, using Desktop")
+                self._use_memory_path(desktop_path)
+                self.ensure_memory_file()
+                return
+            
+            logger.info(f"Memory file created: {self.memory_path}")
     
     def load_memory(self) -> Dict[str, Any]:
         """Load memory from JSON file with enhanced error handling"""
         try:
-            with open(self.memory_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            st = os.stat(self.memory_path)
+            memory_key = (st.st_mtime_ns, st.st_size, self._journal_size())
+            if self._memory is not None and memory_key == self._memory_key:
+                # Shared view, not a copy: callers that mutate it must save_memory()
+                return self._memory
+            
+            data = self._read_snapshot(st.st_size)
                 
             # ✅ IMPROVED: Validate data structure
             if not isinstance(data, dict):
@@ -211,112 +347,254 @@ class LocalTradingMemory:
                     "total_lessons": len(data["lessons"])
                 }
             
+            self._replay_journal(data)
+            for lesson in data["lessons"]:
+                _intern_lesson(lesson)
+            
+            # File was changed behind our back; invalidate derived views too
+            if self._memory is not None:
+                self.version += 1
+            self._memory = data
+            self._memory_key = memory_key
+            self._index_lessons(data["lessons"])
             return data
             
         except FileNotFoundError:
-            self.logger.warning("Memory file not found, creating new one")
+            logger.warning("Memory file not found, creating new one")
             self.ensure_memory_file()
             return self.load_memory()
         
         except json.JSONDecodeError as e:
-            self.logger.error(f"Invalid JSON in memory file: {e}")
+            logger.error(f"Invalid JSON in memory file: {e}")
             # Try to restore from backup
             return self._restore_from_backup()
         
         except Exception as e:
-            self.logger.error(f"Error loading memory: {e}")
+            logger.error(f"Error loading memory: {e}")
             return {"lessons": [], "last_lesson_id": 0, "metadata": {}}
     
+    def _read_snapshot(self, size: int) -> Any:
+        """Parse the memory file, via mmap when it is large and orjson can take a buffer"""
+        if orjson and size > MMAP_THRESHOLD:
+            fd = os.open(self.memory_path, os.O_RDONLY)
+            try:
+                with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+                    # Views must be released before the map can close
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            finally:
+                os.close(fd)
+        
+        # Unbuffered: read() sizes one syscall from fstat, no intermediate buffer copy
+        with open(self.memory_path, 'rb', buffering=0) as f:
+            return _json_loads(f.read())
+    
     def _restore_from_backup(self) -> Dict[str, Any]:
         """Restore memory from most recent backup"""
         try:
             if not self.backup_dir.exists():
                 raise FileNotFoundError("No backup directory")
             
-            backup_files = list(self.backup_dir.glob("trading_memory_backup_*.json"))
+            backup_files = list(self.backup_dir.glob(f"{BACKUP_PREFIX}*.json"))
             if not backup_files:
                 raise FileNotFoundError("No backup files found")
             
             # Get most recent backup
             latest_backup = max(backup_files, key=lambda x: x.stat().st_mtime)
             
-            self.logger.info(f"Restoring from backup: {latest_backup}")
+            logger.info(f"Restoring from backup: {latest_backup}")
+            
+            with open(latest_backup, 'rb') as f:
+                data = _json_loads(f.read())
+            
+            if not isinstance(data, dict):
+                raise ValueError("Invalid backup format: not a dictionary")
+            data.setdefault("lessons", [])
+            data.setdefault("last_lesson_id", 0)
+            data.setdefault("metadata", {})
             
-            with open(latest_backup, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # The backup predates the journal; fold it in before save_memory() removes it
+            self._replay_journal(data)
             
-            # Save restored data as current memory
-            self.save_memory(data)
+            # Save restored data as current memory (don't back up the corrupt file)
+            self.save_memory(data, backup=False)
             
             return data
             
         except Exception as e:
-            self.logger.error(f"Failed to restore from backup: {e}")
+            logger.error(f"Failed to restore from backup: {e}")
             return {"lessons": [], "last_lesson_id": 0, "metadata": {}}
     
-    def save_memory(self, memory_data: Dict[str, Any]):
+    def save_memory(self, memory_data: Dict[str, Any], backup: bool = True):
         """Save memory to JSON file with enhanced safety"""
+        # Keep the previous snapshot, rate-limited, before it is replaced
+        if backup and self.backup_enabled and self._backup_due():
+            self._create_backup()
+        
+        # ✅ IMPROVED: Atomic write with temporary file
+        temp_path = self.memory_path.with_suffix('.tmp')
         try:
-            # ✅ IMPROVED: Atomic write with temporary file
-            temp_path = self.memory_path.with_suffix('.tmp')
-            
             # Update metadata
             if "metadata" in memory_data:
                 memory_data["metadata"]["last_updated"] = datetime.now().isoformat()
                 memory_data["metadata"]["total_lessons"] = len(memory_data.get("lessons", []))
             
             # Write to temporary file first
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(memory_data, f, indent=2, ensure_ascii=False)
+            with open(temp_path, 'wb') as f:
+                f.write(_json_dumps(memory_data))
+                # Data must be on disk before the rename makes it visible
+                f.flush()
+                os.fsync(f.fileno())
             
             # Atomic rename (safer than direct write)
             temp_path.replace(self.memory_path)
+            self.version += 1
+            
+            # Snapshot now holds every lesson; journaled ones are redundant
+            self.journal_path.unlink(missing_ok=True)
             
-            self.logger.debug("Memory saved successfully")
+            st = self.memory_path.stat()
+            self._memory = memory_data
+            self._memory_key = (st.st_mtime_ns, st.st_size, 0)
+            self._index_lessons(memory_data.get("lessons", []))
+            
+            logger.debug("Memory saved successfully")
             
         except Exception as e:
-            self.logger.error(f"Error saving memory: {e}")
+            logger.error(f"Error saving memory: {e}")
+            # Callers may have mutated the cached dict; re-read from disk next time
+            self._memory = None
             # Clean up temp file if it exists
             if temp_path.exists():
                 temp_path.unlink()
             raise
     
+    def _journal_size(self) -> int:
+        """Size of the lesson journal in bytes (0 when absent)"""
+        try:
+            return os.stat(self.journal_path).st_size
+        except FileNotFoundError:
+            return 0
+    
+    def _replay_journal(self, data: Dict[str, Any]):
+        """Append journaled lessons that the snapshot doesn't have yet"""
+        try:
+            # Whole journal in one read, split in C; no per-line Python I/O
+            with open(self.journal_path, 'rb', buffering=0) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return
+        
+        known_ids = {lesson.get("id") for lesson in data["lessons"]}
+        for line in lines:
+            if not line:
+                continue
+            try:
+                lesson = _json_loads(line)
+            except json.JSONDecodeError:
+                # Torn final line from an interrupted append
+                logger.warning("Skipping unreadable journal entry")
+                continue
+            
+            # A crash between snapshot write and journal removal leaves duplicates
+            if lesson.get("id") in known_ids:
+                continue
+            known_ids.add(lesson.get("id"))
+            data["lessons"].append(lesson)
+            try:
+                data["last_lesson_id"] = max(data["last_lesson_id"], int(lesson["id"][1:]))
+            except (KeyError, ValueError, TypeError):
+                pass
+        
+        data["metadata"]["total_lessons"] = len(data["lessons"])
+    
+    def _append_lessons(self, memory: Dict[str, Any], lessons: List[Dict[str, Any]]):
+        """Durably append lessons to the journal (one write, one fsync) and the cached memory"""
+        with open(self.journal_path, 'ab') as f:
+            f.write(b"".join(_json_line(lesson) for lesson in lessons))
+            f.flush()
+            os.fsync(f.fileno())
+        
+        first_position = len(memory["lessons"])
+        memory["lessons"].extend(lessons)
+        memory["last_lesson_id"] += len(lessons)
+        memory["metadata"]["total_lessons"] = len(memory["lessons"])
+        memory["metadata"]["last_updated"] = datetime.now().isoformat()
+        self.version += 1
+        
+        # Keep the cache valid: snapshot untouched, journal grew
+        if self._memory is memory:
+            self._memory_key = self._memory_key[:2] + (self._journal_size(),)
+            for position, lesson in enumerate(lessons, first_position):
+                entry = (lesson.get("date", ""), -position, lesson)
+                bucket = self._by_relevance.setdefault(lesson.get("relevance", 0), [])
+                # New lessons are dated today, so this only walks past today's entries
+                index = 0
+                while index < len(bucket) and bucket[index][:2] > entry[:2]:
+                    index += 1
+                bucket.insert(index, entry)
+        
+        # Bound replay cost at the next start: periodically rewrite the snapshot.
+        # Also fold in when a backup is due, so backups keep up with appended lessons
+        if self._journal_size() > JOURNAL_COMPACT_BYTES or (self.backup_enabled and self._backup_due()):
+            self._compact_journal()
+    
+    def _compact_journal(self):
+        """Fold journaled lessons into the main memory file"""
+        if self._journal_size() == 0:
+            return
+        try:
+            memory = self.load_memory()
+            # Only a successful load is cached; the error fallback would wipe snapshot and journal
+            if memory is not self._memory:
+                logger.warning("Memory file unreadable, keeping lesson journal uncompacted")
+                return
+            self.save_memory(memory)
+            logger.info("Lesson journal compacted into memory file")
+        except Exception as e:
+            logger.error(f"Failed to compact lesson journal: {e}")
+    
+    def _index_lessons(self, lessons: List[Dict]):
+        """Bucket lessons by relevance, each bucket sorted most recent first"""
+        by_relevance = {}
+        for position, lesson in enumerate(lessons):
+            entry = (lesson.get("date", ""), -position, lesson)
+            by_relevance.setdefault(lesson.get("relevance", 0), []).append(entry)
+        
+        # Same order as a stable date sort: newest first, file order on ties
+        for bucket in by_relevance.values():
+            bucket.sort(key=itemgetter(0, 1), reverse=True)
+        self._by_relevance = by_relevance
+    
     def get_recent_lessons(self, limit: int = 10, min_relevance: int = 4, 
                           lesson_type: Optional[str] = None, 
                           tags: Optional[List[str]] = None) -> List[Dict]:
         """Get recent relevant lessons with advanced filtering"""
-        memory = self.load_memory()
-        lessons = memory.get("lessons", [])
+        # Refreshes the relevance index if the file changed
+        self.load_memory()
         
-        # ✅ IMPROVED: Advanced filtering
-        filtered_lessons = []
+        # Merge the pre-sorted relevance buckets and stop after `limit` matches
+        buckets = [bucket for relevance, bucket in self._by_relevance.items()
+                   if relevance >= min_relevance]
+        merged = heapq.merge(*buckets, key=itemgetter(0, 1), reverse=True)
+        lessons = (entry[2] for entry in merged)
         
-        for lesson in lessons:
-            # Relevance filter
-            if lesson.get("relevance", 0) < min_relevance:
-                continue
-            
-            # Type filter
-            if lesson_type and lesson.get("type") != lesson_type:
-                continue
-            
-            # Tags filter
-            if tags:
-                lesson_tags = lesson.get("tags", [])
-                if not any(tag in lesson_tags for tag in tags):
-                    continue
-            
-            filtered_lessons.append(lesson)
+        # ✅ IMPROVED: Advanced filtering
+        if lesson_type:
+            lessons = (lesson for lesson in lessons if lesson.get("type") == lesson_type)
         
-        # Sort by date (most recent first)
-        filtered_lessons.sort(key=lambda x: x.get("date", ""), reverse=True)
+        if tags:
+            # One hashed membership test per lesson tag instead of a nested list scan
+            tag_set = frozenset(tags)
+            lessons = (lesson for lesson in lessons
+                       if not tag_set.isdisjoint(lesson.get("tags", ())))
         
-        return filtered_lessons[:limit]
+        return list(islice(lessons, limit))
     
-    def add_lesson(self, pair: str, lesson_type: str, context: str, 
-                   rule: str, result: str, relevance: int,
-                   tags: Optional[List[str]] = None) -> str:
-        """Add new lesson to memory with enhanced validation"""
+    def _new_lesson(self, lesson_id: str, pair: str, lesson_type: str, context: str,
+                    rule: str, result: str, relevance: int,
+                    tags: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Validate lesson fields and build the stored lesson record"""
         # ✅ IMPROVED: Input validation
         if not all([pair, lesson_type, context, rule, result]):
             raise ValueError("All lesson fields are required")
@@ -324,14 +602,8 @@ class LocalTradingMemory:
         if not 1 <= relevance <= 5:
             raise ValueError("Relevance must be between 1 and 5")
         
-        memory = self.load_memory()
-        
-        # Generate new lesson ID
-        last_id = memory.get("last_lesson_id", 0)
-        new_id = f"L{last_id + 1:03d}"
-        
         new_lesson = {
-            "id": new_id,
+            "id": lesson_id,
             "date": datetime.now().strftime("%Y-%m-%d"),
             "pair": pair.upper(),
             "type": lesson_type,
@@ -343,16 +615,44 @@ class LocalTradingMemory:
             "created_timestamp": datetime.now().isoformat()
         }
         
-        # Add to memory
-        memory["lessons"].append(new_lesson)
-        memory["last_lesson_id"] = last_id + 1
+        _intern_lesson(new_lesson)
+        return new_lesson
+    
+    def add_lesson(self, pair: str, lesson_type: str, context: str, 
+                   rule: str, result: str, relevance: int,
+                   tags: Optional[List[str]] = None) -> str:
+        """Add new lesson to memory with enhanced validation"""
+        memory = self.load_memory()
         
-        # Save updated memory
-        self.save_memory(memory)
+        # Generate new lesson ID
+        last_id = memory.get("last_lesson_id", 0)
+        new_id = f"L{last_id + 1:03d}"
+        
+        new_lesson = self._new_lesson(new_id, pair, lesson_type, context, rule, result, relevance, tags)
         
-        self.logger.info(f"New lesson {new_id} added: {lesson_type} - {result}")
+        # Append to the journal instead of rewriting the whole file
+        self._append_lessons(memory, [new_lesson])
+        
+        logger.info(f"New lesson {new_id} added: {lesson_type} - {result}")
         return new_id
     
+    def add_lessons(self, lessons: List[Dict[str, Any]]) -> List[str]:
+        """Add several lessons (add_lesson keyword dicts) with a single journal write"""
+        memory = self.load_memory()
+        last_id = memory.get("last_lesson_id", 0)
+        
+        # Validate the whole batch before anything is written
+        new_lessons = [self._new_lesson(f"L{last_id + n:03d}", **lesson)
+                       for n, lesson in enumerate(lessons, 1)]
+        if not new_lessons:
+            return []
+        
+        self._append_lessons(memory, new_lessons)
+        
+        logger.info(f"{len(new_lessons)} new lessons added: "
+                         f"{new_lessons[0]['id']}-{new_lessons[-1]['id']}")
+        return [lesson["id"] for lesson in new_lessons]
+    
     def update_lesson(self, lesson_id: str, **updates) -> bool:
         """Update existing lesson"""
         memory = self.load_memory()
@@ -362,17 +662,22 @@ class LocalTradingMemory:
             if lesson.get("id") == lesson_id:
                 # Update allowed fields
                 allowed_updates = ["context", "rule", "result", "relevance", "tags"]
-                for key, value in updates.items():
-                    if key in allowed_updates:
-                        lesson[key] = value
+                changes = {key: value for key, value in updates.items()
+                           if key in allowed_updates and lesson.get(key) != value}
+                
+                # Nothing differs: skip the timestamp bump and the full rewrite
+                if not changes:
+                    logger.debug(f"Lesson {lesson_id} unchanged, not saving")
+                    return True
                 
+                lesson.update(changes)
                 lesson["last_updated"] = datetime.now().isoformat()
                 
                 self.save_memory(memory)
-                self.logger.info(f"Lesson {lesson_id} updated")
+                logger.info(f"Lesson {lesson_id} updated")
                 return True
         
-        self.logger.warning(f"Lesson {lesson_id} not found")
+        logger.warning(f"Lesson {lesson_id} not found")
         return False
     
     def delete_lesson(self, lesson_id: str) -> bool:
@@ -385,12 +690,39 @@ class LocalTradingMemory:
         
         if len(memory["lessons"]) < original_count:
             self.save_memory(memory)
-            self.logger.info(f"Lesson {lesson_id} deleted")
+            logger.info(f"Lesson {lesson_id} deleted")
             return True
         
-        self.logger.warning(f"Lesson {lesson_id} not found")
+        logger.warning(f"Lesson {lesson_id} not found")
         return False
     
+    def _field_search_index(self, lessons: List[Dict], field: str) -> tuple:
+        """Lowercased text and trigram postings for one field, rebuilt when lessons change"""
+        search_key = (self.version, lessons)
+        if self._search_key is None or self._search_key[0] != self.version or self._search_key[1] is not lessons:
+            self._search_index = {}
+            self._search_key = search_key
+        
+        index = self._search_index.get(field)
+        if index is None:
+            texts = []
+            postings: Dict[str, set] = {}
+            for position, lesson in enumerate(lessons):
+                field_value = lesson.get(field, "")
+                
+                # Handle different field types
+                if isinstance(field_value, list):  # tags
+                    text = " ".join(field_value).lower()
+                else:
+                    text = str(field_value).lower()
+                
+                texts.append(text)
+                for i in range(len(text) - 2):
+                    postings.setdefault(text[i:i + 3], set()).add(position)
+            
+            index = self._search_index[field] = (texts, postings)
+        return index
+    
     def search_lessons(self, query: str, search_fields: List[str] = None) -> List[Dict]:
         """Search lessons by text query"""
         if search_fields is None:
@@ -400,45 +732,43 @@ class LocalTradingMemory:
         lessons = memory.get("lessons", [])
         
         query_lower = query.lower()
-        matching_lessons = []
+        trigrams = {query_lower[i:i + 3] for i in range(len(query_lower) - 2)}
+        matches = set()
         
-        for lesson in lessons:
-            for field in search_fields:
-                field_value = lesson.get(field, "")
-                
-                # Handle different field types
-                if isinstance(field_value, list):  # tags
-                    field_text = " ".join(field_value).lower()
-                else:
-                    field_text = str(field_value).lower()
-                
-                if query_lower in field_text:
-                    matching_lessons.append(lesson)
-                    break
+        for field in search_fields:
+            texts, postings = self._field_search_index(lessons, field)
+            
+            # Only lessons holding every query trigram can contain the query
+            if trigrams:
+                posting_sets = sorted((postings.get(gram, ()) for gram in trigrams), key=len)
+                candidates = set(posting_sets[0]).intersection(*posting_sets[1:])
+            else:
+                candidates = range(len(texts))
+            
+            # Confirm the substring (trigrams can match out of order)
+            matches.update(position for position in candidates if query_lower in texts[position])
         
-        return matching_lessons
+        # Keep file order, as the plain scan did
+        return [lessons[position] for position in sorted(matches)]
     
     def format_memory_for_ai(self, lessons: List[Dict]) -> str:
         """Format lessons for AI analysis with enhanced details"""
         if not lessons:
             return "MEMORIA: [Vacía - Sin lecciones relevantes]"
         
-        formatted_lessons = []
-        formatted_lessons.append("=== MEMORIA TRADING ===")
-        
-        for lesson in lessons:
-            # Enhanced formatting with more context
-            tags_str = ", ".join(lesson.get("tags", []))
-            formatted = (
-                f"{lesson['id']}: [{lesson['pair']}] {lesson['type']}\n"
-                f"  📝 Contexto: {lesson['context']}\n"
-                f"  📋 Regla: {lesson['rule']}\n"
-                f"  📊 Resultado: {lesson['result']} | Relevancia: {lesson['relevance']}/5\n"
-                f"  🏷️ Tags: {tags_str}\n"
-            )
-            formatted_lessons.append(formatted)
-        
-        return "\n".join(formatted_lessons)
+        # Enhanced formatting with more context, built in a single join
+        return "=== MEMORIA TRADING ===\n" + "\n".join(
+            f"{lesson['id']}: [{lesson['pair']}] {lesson['type']}\n"
+            f"  📝 Contexto: {lesson['context']}\n"
+            f"  📋 Regla: {lesson['rule']}\n"
+            f"  📊 Resultado: {lesson['result']} | Relevancia: {lesson['relevance']}/5\n"
+            f"  🏷️ Tags: {', '.join(lesson.get('tags', []))}\n"
+            for lesson in lessons
+        )
+    
+    def lesson_count(self) -> int:
+        """Number of stored lessons (served from the cached memory)"""
+        return len(self.load_memory().get("lessons", []))
     
     def get_memory_stats(self) -> Dict[str, Any]:
         """Get comprehensive memory statistics"""
@@ -448,55 +778,35 @@ class LocalTradingMemory:
         if not lessons:
             return {"total": 0, "by_type": {}, "by_relevance": {}, "by_result": {}}
         
-        # Enhanced statistics
-        by_type = {}
-        by_relevance = {}
-        by_result = {}
-        by_tags = {}
+        # Enhanced statistics (Counter does the counting loops in C)
+        by_type = Counter(lesson.get("type", "Unknown") for lesson in lessons)
+        by_relevance = Counter(lesson.get("relevance", 0) for lesson in lessons)
+        by_result = Counter(lesson.get("result", "Unknown") for lesson in lessons)
+        by_tags = Counter(tag for lesson in lessons for tag in lesson.get("tags", []))
         
         win_count = 0
         loss_count = 0
         total_pips = 0
         
-        for lesson in lessons:
-            # Count by type
-            lesson_type = lesson.get("type", "Unknown")
-            by_type[lesson_type] = by_type.get(lesson_type, 0) + 1
-            
-            # Count by relevance
-            relevance = lesson.get("relevance", 0)
-            by_relevance[relevance] = by_relevance.get(relevance, 0) + 1
-            
-            # Count by result
-            result = lesson.get("result", "Unknown")
-            by_result[result] = by_result.get(result, 0) + 1
-            
-            # Count tags
-            for tag in lesson.get("tags", []):
-                by_tags[tag] = by_tags.get(tag, 0) + 1
-            
-            # Analyze wins/losses
-            if "+" in result and "pip" in result:
-                win_count += 1
-                try:
-                    pips = float(result.split("+")[1].split(" ")[0])
-                    total_pips += pips
-                except:
-                    pass
-            elif "-" in result and "pip" in result:
-                loss_count += 1
-                try:
-                    pips = float(result.split("-")[1].split(" ")[0])
-                    total_pips -= pips
-                except:
-                    pass
+        # Analyze wins/losses once per distinct result string
+        for result, count in by_result.items():
+            match = _PIP_RE.search(result)
+            if not match:
+                continue
+            pips = float(match.group(2)) * count
+            if match.group(1) == "+":
+                win_count += count
+                total_pips += pips
+            else:
+                loss_count += count
+                total_pips -= pips
         
         return {
             "total": len(lessons),
-            "by_type": by_type,
-            "by_relevance": by_relevance,
-            "by_result": by_result,
-            "by_tags": by_tags,
+            "by_type": dict(by_type),
+            "by_relevance": dict(by_relevance),
+            "by_result": dict(by_result),
+            "by_tags": dict(by_tags),
             "performance": {
                 "wins": win_count,
                 "losses": loss_count,
@@ -520,27 +830,28 @@ class LocalTradingMemory:
         
         output_path = Path.home() / "Desktop" / output_file
         
-        with open(output_path, 'w', newline='', encoding='utf-8') as csvfile:
+        # Large write buffer: the export goes to disk in a few big writes
+        with open(output_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
             if lessons:
-                # Prepare fieldnames
-                fieldnames = ["id", "date", "pair", "type", "context", "rule", "result", "relevance"]
-                if include_tags:
-                    fieldnames.append("tags")
+                writer = csv.writer(csvfile)
                 
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for lesson in lessons:
-                    row = {k: lesson.get(k, "") for k in fieldnames}
-                    if include_tags and "tags" in lesson:
-                        row["tags"] = "; ".join(lesson["tags"])
-                    writer.writerow(row)
+                if include_tags:
+                    writer.writerow(CSV_FIELDS + ("tags",))
+                    writer.writerows(
+                        [lesson.get(k, "") for k in CSV_FIELDS] + ["; ".join(lesson.get("tags", []))]
+                        for lesson in lessons
+                    )
+                else:
+                    writer.writerow(CSV_FIELDS)
+                    writer.writerows([lesson.get(k, "") for k in CSV_FIELDS] for lesson in lessons)
         
-        self.logger.info(f"Memory exported to: {output_path}")
+        logger.info(f"Memory exported to: {output_path}")
         return output_path
 
 # Example usage and testing
 if __name__ == "__main__":
+    configure_logging()
+    
     # Initialize memory system
     memory = LocalTradingMemory()
     
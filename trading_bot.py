@@ -5,31 +5,95 @@ Sin duplicados, mejor anti-detección, configuración arreglada
 """
 
 import time
-import schedule
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException, WebDriverException
-from webdriver_manager.chrome import ChromeDriverManager
+# selenium / webdriver_manager are imported where used: importing this module stays cheap
 import os
 import random
 import logging
 from pathlib import Path
 from typing import Dict, Optional, List
 import json
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in for base64
+except ImportError:
+    import base64
+
+# Resolved ChromeDriver as "<pinned version>\n<path>" (version empty when unpinned),
+# persisted so later runs skip webdriver-manager's network lookup
+DRIVER_PATH_CACHE = Path("~/.tradingview_bot/chromedriver_path").expanduser()
+
+# Background services and <img> decoding the chart (a <canvas>) doesn't need
+LEAN_CHROME_ARGS = (
+    "--blink-settings=imagesEnabled=false",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,InterestFeedContentSuggestions",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--metrics-recording-only",
+)
+
+# Legend OHLC + price-axis text once series data is drawn, else null
+CHART_SIGNATURE_JS = """
+const legend = document.querySelector(arguments[0]);
+const legendText = legend ? legend.textContent : '';
+if (!/\\d/.test(legendText)) return null;
+const axis = document.querySelector(arguments[1]);
+return legendText + '|' + (axis ? axis.textContent : '');
+"""
+
+# Active interval as TradingView reports it: toolbar button value, else the URL parameter
+ACTIVE_INTERVAL_JS = """
+const button = document.querySelector(arguments[0]);
+const value = button && button.getAttribute('data-value');
+return value || new URL(location.href).searchParams.get('interval');
+"""
+
+# Bounding box of the chart area for a clipped screenshot, or null if not rendered
+CHART_CLIP_JS = """
+const el = document.querySelector(arguments[0]);
+if (!el) return null;
+const r = el.getBoundingClientRect();
+return r.width > 0 && r.height > 0 ? {x: r.x, y: r.y, width: r.width, height: r.height, scale: 1} : null;
+"""
+
+# Looks only at the title and known challenge elements; returns what matched, or null
+CLOUDFLARE_PROBE_JS = """
+const hint = /just a moment|checking your browser|security check|attention required/i.exec(document.title || '');
+if (hint) return hint[0];
+const el = document.querySelector('#challenge-form, #challenge-running, #cf-challenge-running, .cf-browser-verification');
+return el ? (el.id || el.className) : null;
+"""
 
 class TradingViewAutomation:
+    # (pinned version, ChromeDriver path) shared by every instance in this process
+    _driver_cache: Optional[tuple] = None
+    # (date, today_dir, timeframes, pairs) -> full capture result, only today's kept (process-wide)
+    _result_cache: Dict[tuple, Dict[str, str]] = {}
+    
     def __init__(self, headless: bool = False, max_retries: int = 2):
         """Initialize with conservative settings to avoid detection"""
         self.driver = None
+        # Pair whose chart is open in the current driver session
+        self._chart_pair: Optional[str] = None
+        # Gentle mouse movement is done once per Chrome session
+        self._mouse_warmed = False
+        # Set when navigation has just waited for the chart, so the capture needn't wait again
+        self._chart_waited = False
+        # ChromeDriver resolved by a parent automation (parallel workers don't resolve their own)
+        self._given_driver_path: Optional[str] = None
         self.headless = headless
         self.max_retries = max_retries
         self.screenshots_dir = "trading_screenshots"
+        # {date: [timeframe names captured that day]}, only today's entry is kept
+        self.state_file = Path(self.screenshots_dir) / "state.json"
         self.config_file = Path("tradingview_config.json")
         
         # Setup logging
@@ -37,6 +101,8 @@ class TradingViewAutomation:
         
         # Load configuration
         self.config = self._load_config()
+        # Interval value ('240') -> timeframe name ('H4')
+        self._tf_value_to_name = {value: name for name, value in self.config["timeframes"].items()}
         
         # Setup directories
         self.create_directories()
@@ -71,12 +137,36 @@ class TradingViewAutomation:
                 "min_action": 3,
                 "max_action": 6,
                 "screenshot_delay": 5,
+                "chart_ready_timeout": 20,
+                "chart_settle": 1.5,
                 "between_captures": 10
             },
+            "driver": {
+                # Pinned ChromeDriver binary; when set, webdriver-manager is never consulted
+                "path": "",
+                # Exact driver version to install, skipping the "latest" lookup
+                "chrome_version": ""
+            },
+            "capture": {
+                # One Chrome per timeframe, all at once; off keeps the single-session, paced flow
+                "parallel": False,
+                # Dropped via CDP before any navigation; chart data and assets stay allowed
+                "blocked_urls": [
+                    "*google-analytics.com*",
+                    "*googletagmanager.com*",
+                    "*doubleclick.net*",
+                    "*googlesyndication.com*",
+                    "*hotjar.com*",
+                    "*sentry.io*",
+                    "*facebook.net*",
+                    "*/ads/*"
+                ]
+            },
             "selectors": {
                 "chart_container": "[data-name='legend-source-item']",
                 "chart_loaded": ".chart-container",
-                "price_scale": ".price-axis"
+                "price_scale": ".price-axis",
+                "active_interval": "#header-toolbar-intervals button[aria-checked='true']"
             },
             "anti_detection": {
                 "user_agents": [
@@ -92,14 +182,20 @@ class TradingViewAutomation:
         
         try:
             if self.config_file.exists():
-                with open(self.config_file, 'r') as f:
-                    loaded_config = json.load(f)
+                if orjson:
+                    loaded_config = orjson.loads(self.config_file.read_bytes())
+                else:
+                    with open(self.config_file, 'r') as f:
+                        loaded_config = json.load(f)
                 # Deep merge with defaults
                 self._merge_configs(default_config, loaded_config)
                 return default_config
             else:
-                with open(self.config_file, 'w') as f:
-                    json.dump(default_config, f, indent=2)
+                if orjson:
+                    self.config_file.write_bytes(orjson.dumps(default_config, option=orjson.OPT_INDENT_2))
+                else:
+                    with open(self.config_file, 'w') as f:
+                        json.dump(default_config, f, indent=2)
                 return default_config
                 
         except Exception as e:
@@ -107,31 +203,88 @@ class TradingViewAutomation:
             return default_config
     
     def _merge_configs(self, default: Dict, loaded: Dict):
-        """Recursively merge configurations"""
-        for key, value in loaded.items():
-            if key in default:
-                if isinstance(default[key], dict) and isinstance(value, dict):
-                    self._merge_configs(default[key], value)
-                else:
-                    default[key] = value
+        """Merge nested configurations using an explicit stack"""
+        stack = [(default, loaded)]
+        while stack:
+            dst, src = stack.pop()
+            for key, value in src.items():
+                if key in dst:
+                    if isinstance(dst[key], dict) and isinstance(value, dict):
+                        stack.append((dst[key], value))
+                    else:
+                        dst[key] = value
     
     def _load_today_captures(self):
         """Load list of already captured timeframes today"""
         today = datetime.now().strftime("%Y-%m-%d")
+        
+        try:
+            if orjson:
+                state = orjson.loads(self.state_file.read_bytes())
+            else:
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+        except FileNotFoundError:
+            # No state yet (first run or older layout): scan today's folders once
+            self._scan_today_captures(today)
+            self._save_capture_state()
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Unreadable capture state, rescanning: {e}")
+            self._scan_today_captures(today)
+            return
+        
+        for tf_name in state.get(today, []):
+            if tf_name in self.config["timeframes"]:
+                self.captured_today.add(tf_name)
+                self.logger.info(f"Found existing {tf_name} screenshots")
+    
+    def _scan_today_captures(self, today: str):
+        """Find captured timeframes by looking for PNGs in today's folders"""
         today_dir = Path(self.screenshots_dir) / today
         
-        if today_dir.exists():
-            for tf_dir in today_dir.iterdir():
-                if tf_dir.is_dir() and tf_dir.name in self.config["timeframes"]:
-                    # Check if this timeframe has screenshots
-                    screenshots = list(tf_dir.glob("*.png"))
-                    if screenshots:
-                        self.captured_today.add(tf_dir.name)
-                        self.logger.info(f"Found existing {tf_dir.name} screenshots")
+        try:
+            with os.scandir(today_dir) as it:
+                tf_dirs = [entry for entry in it
+                           if entry.name in self.config["timeframes"] and entry.is_dir()]
+        except FileNotFoundError:
+            return
+        
+        for tf_dir in tf_dirs:
+            # Check if this timeframe has screenshots (stops at the first PNG)
+            try:
+                with os.scandir(tf_dir.path) as it:
+                    has_screenshots = any(entry.name.endswith(".png") for entry in it)
+            except FileNotFoundError:
+                continue
+            if has_screenshots:
+                self.captured_today.add(tf_dir.name)
+                self.logger.info(f"Found existing {tf_dir.name} screenshots")
+    
+    def _save_capture_state(self):
+        """Atomically persist today's captured timeframes (older days are dropped)"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        temp_path = self.state_file.with_name(f".state.{os.getpid()}.{id(self)}.tmp")
+        try:
+            state = {today: sorted(self.captured_today)}
+            if orjson:
+                temp_path.write_bytes(orjson.dumps(state))
+            else:
+                with open(temp_path, 'w') as f:
+                    json.dump(state, f)
+            os.replace(temp_path, self.state_file)
+        except OSError as e:
+            self.logger.error(f"Could not save capture state: {e}")
+            temp_path.unlink(missing_ok=True)
     
     def setup_driver(self):
         """Setup Chrome driver with enhanced stealth"""
         try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.service import Service
+            from selenium.webdriver.chrome.options import Options
+            from selenium.common.exceptions import WebDriverException
+            
             chrome_options = Options()
             
             if self.headless:
@@ -154,10 +307,23 @@ class TradingViewAutomation:
             chrome_options.add_argument("--no-sandbox")
             chrome_options.add_argument("--disable-dev-shm-usage")
             chrome_options.add_argument("--disable-extensions")
+            for argument in LEAN_CHROME_ARGS:
+                chrome_options.add_argument(argument)
             
-            # Auto-download ChromeDriver
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Auto-download ChromeDriver only when no cached binary is usable
+            if self._given_driver_path:
+                driver_path, from_cache = self._given_driver_path, False
+            else:
+                driver_path, from_cache = self._resolve_driver_path()
+            try:
+                self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+            except WebDriverException as e:
+                if not from_cache:
+                    raise
+                # Chrome may have updated past the cached driver: reinstall once
+                self.logger.warning(f"Cached ChromeDriver failed ({e}), reinstalling")
+                driver_path, _ = self._resolve_driver_path(refresh=True)
+                self.driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
             
             # Essential stealth scripts
             essential_scripts = [
@@ -170,12 +336,61 @@ class TradingViewAutomation:
                 except:
                     pass
             
+            # Skip ads/telemetry downloads; the screenshot only needs the chart
+            blocked_urls = self.config["capture"]["blocked_urls"]
+            if blocked_urls:
+                try:
+                    self.driver.execute_cdp_cmd("Network.enable", {})
+                    self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls})
+                except Exception as e:
+                    self.logger.debug(f"URL blocking unavailable: {e}")
+            
             self.logger.info("Chrome driver configured with conservative stealth")
             
         except Exception as e:
             self.logger.error(f"Failed to setup Chrome driver: {e}")
             raise
     
+    def _resolve_driver_path(self, refresh: bool = False) -> tuple:
+        """ChromeDriver path and whether it came from a cache (pinned, process, disk, install)"""
+        # An explicitly pinned binary wins and is never replaced automatically
+        pinned = self.config["driver"]["path"]
+        if pinned:
+            if os.path.exists(pinned):
+                return pinned, False
+            self.logger.warning(f"Pinned ChromeDriver not found: {pinned}")
+        
+        # A cached driver is reused only if it was installed for the pinned version (if any)
+        chrome_version = self.config["driver"]["chrome_version"]
+        
+        if not refresh:
+            cached = self._driver_cache
+            if cached is None:
+                try:
+                    lines = DRIVER_PATH_CACHE.read_text().splitlines()
+                    # Older cache files hold just the path
+                    cached = (lines[0], lines[1]) if len(lines) > 1 else ("", lines[0])
+                except (OSError, IndexError):
+                    cached = None
+            
+            if cached and os.path.exists(cached[1]) and (not chrome_version or cached[0] == chrome_version):
+                TradingViewAutomation._driver_cache = cached
+                return cached[1], True
+        
+        from webdriver_manager.chrome import ChromeDriverManager
+        
+        manager = ChromeDriverManager(driver_version=chrome_version) if chrome_version else ChromeDriverManager()
+        driver_path = manager.install()
+        TradingViewAutomation._driver_cache = (chrome_version, driver_path)
+        
+        try:
+            DRIVER_PATH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            DRIVER_PATH_CACHE.write_text(f"{chrome_version}\n{driver_path}")
+        except OSError as e:
+            self.logger.warning(f"Could not persist ChromeDriver path: {e}")
+        
+        return driver_path, False
+    
     def create_directories(self):
         """Create directories for screenshots"""
         base_dir = Path(self.screenshots_dir)
@@ -206,6 +421,8 @@ class TradingViewAutomation:
     def gentle_mouse_movement(self):
         """Very gentle mouse movements"""
         try:
+            from selenium.webdriver.common.action_chains import ActionChains
+            
             actions = ActionChains(self.driver)
             
             # Single, small movement
@@ -221,20 +438,12 @@ class TradingViewAutomation:
     def check_for_cloudflare(self) -> bool:
         """Check for Cloudflare challenge"""
         try:
-            page_source = self.driver.page_source.lower()
-            cloudflare_indicators = [
-                "checking your browser",
-                "cloudflare",
-                "security check",
-                "please wait",
-                "ray id"
-            ]
+            # Small in-page probe instead of shipping the whole page_source over WebDriver
+            indicator = self.driver.execute_script(CLOUDFLARE_PROBE_JS)
+            if indicator:
+                self.logger.warning(f"Cloudflare challenge detected: {indicator}")
+                return True
             
-            for indicator in cloudflare_indicators:
-                if indicator in page_source:
-                    self.logger.warning(f"Cloudflare challenge detected: {indicator}")
-                    return True
-                    
             return False
             
         except Exception as e:
@@ -244,6 +453,8 @@ class TradingViewAutomation:
     def wait_for_page_ready(self, timeout: int = 30) -> bool:
         """Wait for page to be fully ready"""
         try:
+            from selenium.webdriver.support.ui import WebDriverWait
+            
             # Wait for document ready
             WebDriverWait(self.driver, timeout).until(
                 lambda driver: driver.execute_script("return document.readyState") == "complete"
@@ -259,8 +470,8 @@ class TradingViewAutomation:
                     self.logger.error("Cloudflare challenge not resolved")
                     return False
             
-            # Additional wait for TradingView to load
-            time.sleep(self.config["delays"]["screenshot_delay"])
+            # Additional wait for TradingView to load: until the chart canvas is drawn
+            self._wait_for_chart()
             
             return True
             
@@ -268,15 +479,38 @@ class TradingViewAutomation:
             self.logger.error(f"Page ready check failed: {e}")
             return False
     
+    def _chart_signature(self) -> Optional[str]:
+        """Current legend/price-axis text, or None while no series data is drawn"""
+        selectors = self.config["selectors"]
+        return self.driver.execute_script(
+            CHART_SIGNATURE_JS, selectors["chart_container"], selectors["price_scale"]
+        )
+    
+    def _wait_for_chart(self, previous: Optional[str] = None) -> bool:
+        """Wait until series data is drawn (and differs from previous), then settle briefly"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+        
+        try:
+            WebDriverWait(self.driver, self.config["delays"]["chart_ready_timeout"]).until(
+                lambda driver: self._chart_signature() not in (None, previous)
+            )
+            ready = True
+        except TimeoutException:
+            # Same outcome as the old fixed delay: carry on and let validation judge the PNG
+            self.logger.warning("Chart data not detected, continuing anyway")
+            ready = False
+        
+        # Legend values land a moment before the last candles finish painting
+        time.sleep(self.config["delays"]["chart_settle"])
+        self._chart_waited = True
+        return ready
+    
     def navigate_to_chart(self, pair: str, timeframe: str) -> bool:
         """Navigate to chart with single attempt"""
         try:
             # Check if already captured
-            timeframe_name = None
-            for tf_name, tf_value in self.config["timeframes"].items():
-                if tf_value == timeframe:
-                    timeframe_name = tf_name
-                    break
+            timeframe_name = self._tf_value_to_name.get(timeframe)
             
             if timeframe_name and timeframe_name in self.captured_today:
                 self.logger.info(f"⏭️ {timeframe_name} already captured today, skipping")
@@ -286,9 +520,17 @@ class TradingViewAutomation:
             if not self.driver:
                 self.setup_driver()
             
+            self._chart_waited = False
+            
+            # Same pair already open: change interval in-page instead of reloading the chart
+            if self._chart_pair == pair and self._switch_interval(timeframe):
+                self.logger.info(f"✅ Switched {pair} to {timeframe_name or timeframe}")
+                return True
+            
             url = f"https://www.tradingview.com/chart/?symbol=FX%3A{pair}&interval={timeframe}"
             self.logger.info(f"🌐 Navigating to {pair} {timeframe_name or timeframe}")
             
+            self._chart_pair = None
             self.driver.get(url)
             
             # Conservative wait for page load
@@ -296,8 +538,16 @@ class TradingViewAutomation:
                 self.logger.error(f"Page not ready for {pair} {timeframe_name or timeframe}")
                 return False
             
-            # Gentle interaction
-            self.gentle_mouse_movement()
+            if not self._interval_is(timeframe):
+                self.logger.error(f"Chart did not load interval {timeframe} for {pair}")
+                return False
+            
+            self._chart_pair = pair
+            
+            # Gentle interaction, only on the session's first load
+            if not self._mouse_warmed:
+                self.gentle_mouse_movement()
+                self._mouse_warmed = True
             
             self.logger.info(f"✅ Successfully loaded {pair} {timeframe_name or timeframe}")
             return True
@@ -306,6 +556,41 @@ class TradingViewAutomation:
             self.logger.error(f"Navigation error for {pair} {timeframe}: {e}")
             return False
     
+    def _switch_interval(self, timeframe: str) -> bool:
+        """Change the open chart's interval by typing it (TradingView shortcut) plus Enter"""
+        try:
+            from selenium.webdriver.common.action_chains import ActionChains
+            from selenium.webdriver.common.keys import Keys
+            
+            previous = self._chart_signature()
+            ActionChains(self.driver).send_keys(timeframe).send_keys(Keys.ENTER).perform()
+            
+            # A dropped keystroke would leave the old timeframe on screen: confirm it changed
+            if not self._interval_is(timeframe):
+                self.logger.warning(f"Interval did not switch to {timeframe}, reloading")
+                return False
+            
+            # Chart redraws in place: wait for the old timeframe's data to be replaced
+            return self._wait_for_chart(previous)
+            
+        except Exception as e:
+            self.logger.warning(f"In-page interval switch failed, reloading: {e}")
+            return False
+    
+    def _interval_is(self, timeframe: str, timeout: float = 5) -> bool:
+        """Wait briefly for the chart's active interval to read back as timeframe"""
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+        
+        selector = self.config["selectors"]["active_interval"]
+        try:
+            WebDriverWait(self.driver, timeout).until(
+                lambda driver: driver.execute_script(ACTIVE_INTERVAL_JS, selector) == timeframe
+            )
+            return True
+        except TimeoutException:
+            return False
+    
     def take_screenshot(self, pair: str, timeframe_name: str) -> Optional[str]:
         """Take screenshot with duplicate prevention"""
         try:
@@ -320,16 +605,19 @@ class TradingViewAutomation:
             tf_dir = self.today_dir / timeframe_name
             filepath = tf_dir / filename
             
-            # Extra wait before screenshot
-            time.sleep(3)
+            # Make sure the chart is drawn, unless navigation has just waited for it
+            if not self._chart_waited:
+                self._wait_for_chart()
+            self._chart_waited = False
             
             # Take screenshot
-            self.driver.save_screenshot(str(filepath))
+            self._capture_chart_png(filepath)
             
             # Validate
             if self.validate_screenshot(filepath):
                 # Mark as captured
                 self.captured_today.add(timeframe_name)
+                self._save_capture_state()
                 self.logger.info(f"📸 Screenshot saved: {filename}")
                 return str(filepath)
             else:
@@ -340,13 +628,29 @@ class TradingViewAutomation:
             self.logger.error(f"Screenshot error: {e}")
             return None
     
+    def _capture_chart_png(self, filepath: Path):
+        """Write a PNG of just the chart area via CDP, falling back to a full-window screenshot"""
+        try:
+            params = {"format": "png", "captureBeyondViewport": False}
+            clip = self.driver.execute_script(CHART_CLIP_JS, self.config["selectors"]["chart_loaded"])
+            if clip:
+                params["clip"] = clip
+            
+            result = self.driver.execute_cdp_cmd("Page.captureScreenshot", params)
+            filepath.write_bytes(base64.b64decode(result["data"]))
+            
+        except Exception as e:
+            self.logger.debug(f"CDP screenshot unavailable, using WebDriver: {e}")
+            self.driver.save_screenshot(str(filepath))
+    
     def validate_screenshot(self, filepath: Path) -> bool:
         """Validate screenshot file"""
         try:
-            if not filepath.exists():
+            # One stat answers both "exists?" and "how big?"
+            try:
+                file_size = filepath.stat().st_size
+            except FileNotFoundError:
                 return False
-            
-            file_size = filepath.stat().st_size
             min_size = 30 * 1024  # 30KB minimum
             
             if file_size < min_size:
@@ -365,6 +669,15 @@ class TradingViewAutomation:
         if pairs is None:
             pairs = self.config["pairs"]
         
+        # Fully captured earlier in this process: answer without re-scanning folders
+        today = datetime.now().strftime("%Y-%m-%d")
+        cache_key = (today, os.path.abspath(self.today_dir),
+                     tuple(self.config["timeframes"].items()), tuple(pairs))
+        cached = self._result_cache.get(cache_key)
+        if cached is not None and all(os.path.exists(path) for path in cached.values()):
+            self.logger.info("✅ All timeframes already captured today!")
+            return dict(cached)
+        
         screenshots = {}
         
         try:
@@ -381,36 +694,48 @@ class TradingViewAutomation:
                 # Return existing screenshots
                 for tf_name in self.config["timeframes"].keys():
                     tf_dir = self.today_dir / tf_name
-                    existing_screenshots = list(tf_dir.glob("*.png"))
-                    if existing_screenshots:
-                        screenshots[tf_name] = str(existing_screenshots[-1])  # Most recent
+                    try:
+                        with os.scandir(tf_dir) as it:
+                            # Names end in HH-MM-SS, so the greatest name is the most recent
+                            latest = max((entry.name for entry in it if entry.name.endswith(".png")), default=None)
+                    except FileNotFoundError:
+                        # Folder removed since start-up: nothing to return for this timeframe
+                        continue
+                    if latest:
+                        screenshots[tf_name] = str(tf_dir / latest)
+                self._remember_full_capture(cache_key, pairs, screenshots)
                 return screenshots
             
             self.logger.info(f"📋 Need to capture: {[tf[0] for tf in timeframes_needed]}")
             
-            for pair in pairs:
-                for tf_name, tf_value in timeframes_needed:
-                    try:
-                        # Navigate and capture
-                        if self.navigate_to_chart(pair, tf_value):
-                            filepath = self.take_screenshot(pair, tf_name)
+            if self.config["capture"]["parallel"] and len(pairs) * len(timeframes_needed) > 1:
+                screenshots = self._capture_parallel(pairs, timeframes_needed)
+            else:
+                for pair in pairs:
+                    for tf_name, tf_value in timeframes_needed:
+                        try:
+                            # Navigate and capture
+                            if self.navigate_to_chart(pair, tf_value):
+                                filepath = self.take_screenshot(pair, tf_name)
                             
-                            if filepath:
-                                key = f"{pair}_{tf_name}" if len(pairs) > 1 else tf_name
-                                screenshots[key] = filepath
-                                self.logger.info(f"✅ Captured {tf_name}")
-                            else:
-                                self.logger.error(f"❌ Failed to capture {tf_name}")
+                                if filepath:
+                                    key = f"{pair}_{tf_name}" if len(pairs) > 1 else tf_name
+                                    screenshots[key] = filepath
+                                    self.logger.info(f"✅ Captured {tf_name}")
+                                else:
+                                    self.logger.error(f"❌ Failed to capture {tf_name}")
                         
-                        # Wait between captures
-                        if tf_name != timeframes_needed[-1][0]:  # Not the last one
-                            wait_time = self.config["delays"]["between_captures"]
-                            self.logger.info(f"⏳ Waiting {wait_time}s before next capture...")
-                            time.sleep(wait_time)
+                            # Wait between captures
+                            if tf_name != timeframes_needed[-1][0]:  # Not the last one
+                                wait_time = self.config["delays"]["between_captures"]
+                                self.logger.info(f"⏳ Waiting {wait_time}s before next capture...")
+                                time.sleep(wait_time)
                         
-                    except Exception as e:
-                        self.logger.error(f"Error capturing {pair} {tf_name}: {e}")
-                        continue
+                        except Exception as e:
+                            self.logger.error(f"Error capturing {pair} {tf_name}: {e}")
+                            continue
+            
+            self._remember_full_capture(cache_key, pairs, screenshots)
             
             if screenshots:
                 self.logger.info(f"🎉 Session completed! Captured: {len(screenshots)}")
@@ -423,9 +748,62 @@ class TradingViewAutomation:
         except Exception as e:
             self.logger.error(f"Error during capture session: {e}")
             return screenshots
+    
+    def _remember_full_capture(self, cache_key: tuple, pairs: List[str], screenshots: Dict[str, str]):
+        """Cache a result that covers every pair/timeframe (entries from older days are dropped)"""
+        timeframes = self.config["timeframes"]
+        if len(pairs) > 1:
+            expected = {f"{pair}_{tf_name}" for pair in pairs for tf_name in timeframes}
+        else:
+            expected = set(timeframes)
+        
+        if set(screenshots) == expected:
+            kept = {key: value for key, value in self._result_cache.items() if key[0] == cache_key[0]}
+            kept[cache_key] = dict(screenshots)
+            TradingViewAutomation._result_cache = kept
+    
+    def _capture_parallel(self, pairs: List[str], timeframes_needed: List[tuple]) -> Dict[str, str]:
+        """Capture every pair/timeframe concurrently, each in its own Chrome session"""
+        tasks = [(pair, tf_name, tf_value) for pair in pairs for tf_name, tf_value in timeframes_needed]
+        self.logger.info(f"⚡ Capturing {len(tasks)} charts in parallel")
+        
+        screenshots = {}
+        
+        # Resolve (installing if needed) once here, so workers never race on the install/cache
+        try:
+            driver_path, _ = self._resolve_driver_path()
+        except Exception as e:
+            self.logger.error(f"Could not resolve ChromeDriver: {e}")
+            return screenshots
         
-        finally:
-            self.cleanup_driver()
+        # One Chrome per timeframe at most; extra pairs queue behind them
+        with ThreadPoolExecutor(max_workers=min(len(tasks), len(timeframes_needed))) as pool:
+            results = pool.map(lambda task: self._capture_in_worker(*task, driver_path), tasks)
+            
+            # Results are collected on this thread, so captured_today needs no lock
+            for (pair, tf_name, _), filepath in zip(tasks, results):
+                if filepath:
+                    key = f"{pair}_{tf_name}" if len(pairs) > 1 else tf_name
+                    screenshots[key] = filepath
+                    self.captured_today.add(tf_name)
+                    self.logger.info(f"✅ Captured {tf_name}")
+                else:
+                    self.logger.error(f"❌ Failed to capture {tf_name}")
+        
+        # Workers each saved only their own timeframe; write the combined set last
+        self._save_capture_state()
+        return screenshots
+    
+    def _capture_in_worker(self, pair: str, tf_name: str, tf_value: str, driver_path: str) -> Optional[str]:
+        """Navigate and capture one chart with a dedicated automation instance"""
+        try:
+            with TradingViewAutomation(headless=self.headless, max_retries=self.max_retries) as worker:
+                worker._given_driver_path = driver_path
+                if worker.navigate_to_chart(pair, tf_value):
+                    return worker.take_screenshot(pair, tf_name)
+        except Exception as e:
+            self.logger.error(f"Error capturing {pair} {tf_name}: {e}")
+        return None
     
     def cleanup_driver(self):
         """Safely cleanup Chrome driver"""
@@ -438,6 +816,9 @@ class TradingViewAutomation:
                 self.logger.error(f"Error closing driver: {e}")
             finally:
                 self.driver = None
+                self._chart_pair = None
+                self._mouse_warmed = False
+                self._chart_waited = False
     
     def log_session_summary(self, screenshots: Dict[str, str]):
         """Log session summary"""
@@ -470,25 +851,24 @@ class TradingViewAutomation:
         try:
             self.logger.info("Testing TradingView connection...")
             
-            if not self.driver:
-                self.setup_driver()
-            
-            self.driver.get("https://www.tradingview.com")
-            time.sleep(5)
+            # A HEAD request answers reachability without launching Chrome
+            user_agent = self.config["anti_detection"]["user_agents"][0]
+            request = urllib.request.Request(
+                "https://www.tradingview.com", method="HEAD", headers={"User-Agent": user_agent}
+            )
+            with urllib.request.urlopen(request, timeout=5) as response:
+                status = response.status
             
-            # Simple page check
-            if "TradingView" in self.driver.title:
+            if status == 200:
                 self.logger.info("✅ TradingView connection test passed")
                 return True
             else:
-                self.logger.error("❌ TradingView connection test failed")
+                self.logger.error(f"❌ TradingView connection test failed (HTTP {status})")
                 return False
                 
         except Exception as e:
             self.logger.error(f"Connection test error: {e}")
             return False
-        finally:
-            self.cleanup_driver()
     
     def __enter__(self):
         """Context manager entry"""
@@ -501,8 +881,9 @@ class TradingViewAutomation:
 def main():
     """Main function for testing"""
     try:
-        automation = TradingViewAutomation()
-        result = automation.daily_analysis_job()
+        # One Chrome session for every timeframe, closed on exit
+        with TradingViewAutomation() as automation:
+            result = automation.daily_analysis_job()
         
         if result:
             print("✅ Automation test successful!")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Utilidades compartidas por los sistemas de trading
+Carga de configuración cacheada y cálculo de la próxima sesión diaria
+"""
+
+import time
+import copy
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Any, Mapping
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Parsed configs shared across instances: (path, defaults id) -> (mtime_ns, size, config)
+_CONFIG_CACHE: Dict[tuple, tuple] = {}
+
+def next_daily_run(daily_time: str, now: Optional[float] = None) -> float:
+    """Timestamp of the next occurrence of a daily HH:MM time"""
+    now = time.time() if now is None else now
+    hour, minute = map(int, daily_time.split(':'))
+    target = datetime.fromtimestamp(now).replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target.timestamp() <= now:
+        target += timedelta(days=1)
+    return target.timestamp()
+
+def merge_config(default: Dict, loaded: Dict):
+    """Merge loaded config into defaults using an explicit stack"""
+    stack = [(default, loaded)]
+    while stack:
+        dst, src = stack.pop()
+        for key, value in src.items():
+            if key in dst:
+                if isinstance(dst[key], dict) and isinstance(value, dict):
+                    stack.append((dst[key], value))
+                else:
+                    dst[key] = value
+
+def load_config(config_file: Path, defaults: Mapping[str, Any]) -> Dict[str, Any]:
+    """Load config_file merged over defaults; writes defaults if the file is missing"""
+    try:
+        if config_file.exists():
+            # Reuse the parsed config while the file is unchanged; both systems read the
+            # same file with different defaults, so those are part of the key
+            cache_key = (config_file.absolute(), id(defaults))
+            st = config_file.stat()
+            cached = _CONFIG_CACHE.get(cache_key)
+            if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+                return copy.deepcopy(cached[2])
+
+            if orjson:
+                loaded_config = orjson.loads(config_file.read_bytes())
+            else:
+                with open(config_file, 'r', encoding='utf-8') as f:
+                    loaded_config = json.load(f)
+
+            config = copy.deepcopy(dict(defaults))
+            merge_config(config, loaded_config)
+            _CONFIG_CACHE[cache_key] = (st.st_mtime_ns, st.st_size, copy.deepcopy(config))
+            return config
+        else:
+            if orjson:
+                config_file.write_bytes(orjson.dumps(dict(defaults), option=orjson.OPT_INDENT_2))
+            else:
+                with open(config_file, 'w', encoding='utf-8') as f:
+                    json.dump(dict(defaults), f, indent=2)
+            return copy.deepcopy(dict(defaults))
+
+    except Exception as e:
+        print(f"Error loading config: {e}, using defaults")
+        return copy.deepcopy(dict(defaults))
@@ -5,29 +5,216 @@ Sistema completo automático con análisis de Claude
 """
 
 import time
-import schedule
+import heapq
+import select
 from datetime import datetime, time as dt_time
 import os
 import sys
 import platform
 import logging
+import logging.handlers
 from pathlib import Path
-from typing import Dict, Optional, List, Any
-import json
+from typing import Dict, Optional, List, Any, Tuple, NamedTuple
+from types import MappingProxyType
+import functools
 import signal
 import threading
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
 # Import our components
 try:
-    from local_memory_system import LocalTradingMemory
+    from local_memory_system import LocalTradingMemory, configure_logging as configure_memory_logging
     from claude_trader import ClaudeTrader
+    from automation_loader import resolve_automation_class
+    from trading_common import load_config, next_daily_run
 except ImportError as e:
     print(f"❌ Error importing modules: {e}")
-    print("Ensure you have: local_memory_system.py, claude_trader.py")
+    print("Ensure you have: local_memory_system.py, claude_trader.py, automation_loader.py, trading_common.py")
     sys.exit(1)
 
+# Optional: event-driven MT5 status monitoring
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+class MT5StatusHandler(FileSystemEventHandler):
+    """Run a monitoring pass whenever MT5 rewrites the status file"""
+    def __init__(self, system):
+        super().__init__()
+        self.system = system
+        self.status_path = str(system.mt5_status_file)
+        self.mt5_paths = {self.status_path, str(system.mt5_commands_file)}
+    
+    def on_modified(self, event):
+        if event.src_path == self.status_path:
+            self.system.monitoring_session()
+    
+    on_created = on_modified
+    
+    def on_deleted(self, event):
+        # An MT5 file vanished: make ensure_all_files_exist re-probe the disk
+        if event.src_path in self.mt5_paths:
+            self.system._mt5_ready = False
+    
+    def on_moved(self, event):
+        self.on_deleted(event)
+        # EA wrote the status via rename-into-place
+        if getattr(event, 'dest_path', None) == self.status_path:
+            self.system.monitoring_session()
+
+class KqueueStatusWatcher(threading.Thread):
+    """Block on kqueue vnode events for the MT5 status file (macOS/BSD)"""
+    WATCH_FLAGS = ('KQ_NOTE_WRITE', 'KQ_NOTE_EXTEND', 'KQ_NOTE_DELETE', 'KQ_NOTE_RENAME')
+    
+    def __init__(self, system):
+        super().__init__(daemon=True)
+        self.system = system
+        self.status_path = str(system.mt5_status_file)
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        fflags = 0
+        for name in self.WATCH_FLAGS:
+            fflags |= getattr(select, name)
+        replaced = select.KQ_NOTE_DELETE | select.KQ_NOTE_RENAME
+        
+        kq = select.kqueue()
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    fd = os.open(self.status_path, os.O_RDONLY)
+                except FileNotFoundError:
+                    self._stop_event.wait(1)
+                    continue
+                
+                try:
+                    kev = select.kevent(fd, filter=select.KQ_FILTER_VNODE,
+                                        flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR,
+                                        fflags=fflags)
+                    kq.control([kev], 0)
+                    
+                    while not self._stop_event.is_set():
+                        # Short timeout only so stop() is noticed; no work until the EA writes
+                        events = kq.control(None, 1, 1.0)
+                        if not events:
+                            continue
+                        
+                        if events[0].fflags & select.KQ_NOTE_DELETE:
+                            self.system._mt5_ready = False
+                        self.system.monitoring_session()
+                        if events[0].fflags & replaced:
+                            break  # File was replaced, watch the new inode
+                finally:
+                    os.close(fd)
+        finally:
+            kq.close()
+    
+    def stop(self):
+        self._stop_event.set()
+
+# Built once; _load_config deep-copies it before merging the user file
+DEFAULT_CONFIG = MappingProxyType({
+    "automation": {
+        "mode": "claude_ai",
+        "claude_timeout": 120,  # 2 minutes for Claude analysis
+        "screenshot_validation": True,
+        "auto_backup": True,
+        "error_recovery": True,
+        "headless_mode": True
+    },
+    "trading": {
+        "pairs": ["EURUSD"],
+        "timeframes": ["H4", "H1", "M15"],
+        "daily_session_time": "13:00",
+        "monitoring_interval": 15,
+        "trading_hours": {
+            "start": "14:00",
+            "end": "17:00"
+        },
+        "max_retries": 3
+    },
+    "directories": {
+        "screenshots": "trading_screenshots",
+        "logs": "logs",
+        "backups": "backups"
+    },
+    "mt5": {
+        "auto_detect_path": True,
+        "custom_path": None,
+        "command_timeout": 30,
+        "status_check_interval": 5,
+        "fsync_commands": True
+    },
+    "claude_ai": {
+        "enabled": True,
+        "model": "claude-3-5-sonnet-20241022",
+        "max_retries": 2,
+        "fallback_decision": "1"  # WAIT if Claude fails
+    },
+    "notifications": {
+        "log_level": "INFO",
+        "file_logging": True,
+        "console_logging": True
+    }
+})
+
+class MT5Status(NamedTuple):
+    """Parsed line of the MT5 EA status file"""
+    status: str
+    ticket: int = 0
+    entry: float = 0.0
+    sl: float = 0.0
+    tp: float = 0.0
+    timestamp: str = ""
+    message: str = ""
+    is_active: bool = False
+    direction: Optional[str] = None
+    raw_data: str = ""
+
+# Shared results for fixed error states
+STATUS_FILE_NOT_FOUND = MT5Status('FILE_NOT_FOUND', message='Status file does not exist')
+STATUS_UNREADABLE = MT5Status('UNREADABLE', message='File contains unreadable data')
+
+@functools.lru_cache(maxsize=4)
+def _detect_mt5_dir(system: str, home: str) -> Tuple[Path, bool]:
+    """Find the MT5 common files directory (cached per platform and home)"""
+    home = Path(home)
+    
+    if system == "Darwin":  # macOS
+        possible_paths = [
+            home / "Library/Application Support/net.metaquotes.wine.metatrader5/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files",
+            home / ".wine/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files",
+            home / "Documents/MT5_Files",
+            home / "Desktop/MT5_Files"
+        ]
+    elif system == "Windows":
+        possible_paths = [
+            Path(os.environ.get('APPDATA', '')) / "MetaQuotes/Terminal/Common/Files",
+            home / "AppData/Roaming/MetaQuotes/Terminal/Common/Files",
+            Path("C:/Program Files/MetaTrader 5/MQL5/Files"),
+            Path("C:/Program Files (x86)/MetaTrader 5/MQL5/Files")
+        ]
+    else:  # Linux
+        possible_paths = [
+            home / ".wine/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files",
+            home / ".mt5/Files",
+            home / "Documents/MT5_Files"
+        ]
+    
+    for path in possible_paths:
+        if path.exists():
+            return path, True
+    
+    return possible_paths[0], False
+
 class SistemaTradingClaudeAI:
+    # Decision/command codes shared by the EA protocol and the prompts
+    _DECISION_NAMES = {'1': 'WAIT', '2': 'LONG', '3': 'SHORT', '4': 'CLOSE'}
+    
     def __init__(self, config_file: str = "trading_system_config.json"):
         """Initialize trading system with Claude AI integration"""
         self.config_file = Path(config_file)
@@ -36,7 +223,15 @@ class SistemaTradingClaudeAI:
         # Setup logging
         self._setup_logging()
         
+        # Trading hours parsed once into seconds since midnight
+        trading_hours = self.config["trading"]["trading_hours"]
+        start = dt_time.fromisoformat(trading_hours["start"])
+        end = dt_time.fromisoformat(trading_hours["end"])
+        self._trading_start_sec = start.hour * 3600 + start.minute * 60 + start.second
+        self._trading_end_sec = end.hour * 3600 + end.minute * 60 + end.second
+        
         # Initialize components
+        configure_memory_logging()
         self.memory = LocalTradingMemory()
         self.claude_trader = ClaudeTrader()  # Initialize Claude API
         self.screenshots_dir = Path(self.config["directories"]["screenshots"])
@@ -51,6 +246,21 @@ class SistemaTradingClaudeAI:
         self.shutdown_requested = False
         self.session_active = False
         
+        # Last parsed MT5 status, keyed by file (mtime_ns, size)
+        self._status_cache: Optional[Tuple[int, int, MT5Status]] = None
+        self.status_observer = None
+        self._mt5_ready = False
+        
+        # Formatted memory, invalidated by LocalTradingMemory.version
+        self._memory_cache = None
+        self._memory_version = -1
+        
+        # Status watchers and the polling thread may both check the trade; one at a time
+        self._monitor_lock = threading.Lock()
+        
+        # Post-trade processing runs off the monitor thread, one job at a time
+        self._post_trade_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='post-trade')
+        
         # Setup signal handlers
         self._setup_signal_handlers()
         
@@ -63,72 +273,7 @@ class SistemaTradingClaudeAI:
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration optimized for Claude automation"""
-        default_config = {
-            "automation": {
-                "mode": "claude_ai",
-                "claude_timeout": 120,  # 2 minutes for Claude analysis
-                "screenshot_validation": True,
-                "auto_backup": True,
-                "error_recovery": True,
-                "headless_mode": True
-            },
-            "trading": {
-                "pairs": ["EURUSD"],
-                "timeframes": ["H4", "H1", "M15"],
-                "daily_session_time": "13:00",
-                "monitoring_interval": 15,
-                "trading_hours": {
-                    "start": "14:00",
-                    "end": "17:00"
-                },
-                "max_retries": 3
-            },
-            "directories": {
-                "screenshots": "trading_screenshots",
-                "logs": "logs",
-                "backups": "backups"
-            },
-            "mt5": {
-                "auto_detect_path": True,
-                "custom_path": None,
-                "command_timeout": 30,
-                "status_check_interval": 5
-            },
-            "claude_ai": {
-                "enabled": True,
-                "model": "claude-3-5-sonnet-20241022",
-                "max_retries": 2,
-                "fallback_decision": "1"  # WAIT if Claude fails
-            },
-            "notifications": {
-                "log_level": "INFO",
-                "file_logging": True,
-                "console_logging": True
-            }
-        }
-        
-        try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                self._merge_config(default_config, loaded_config)
-                return default_config
-            else:
-                with open(self.config_file, 'w', encoding='utf-8') as f:
-                    json.dump(default_config, f, indent=2)
-                return default_config
-        except Exception as e:
-            print(f"Error loading config: {e}, using defaults")
-            return default_config
-    
-    def _merge_config(self, default: Dict, loaded: Dict):
-        """Recursively merge configs"""
-        for key, value in loaded.items():
-            if key in default:
-                if isinstance(default[key], dict) and isinstance(value, dict):
-                    self._merge_config(default[key], value)
-                else:
-                    default[key] = value
+        return load_config(self.config_file, DEFAULT_CONFIG)
     
     def _setup_logging(self):
         """Setup comprehensive logging"""
@@ -141,8 +286,12 @@ class SistemaTradingClaudeAI:
         
         # File handler
         if self.config["notifications"]["file_logging"]:
-            log_file = log_dir / f"trading_claude_{datetime.now().strftime('%Y%m%d')}.log"
-            file_handler = logging.FileHandler(log_file, encoding='utf-8')
+            # Rotate at midnight so long-running processes don't keep writing to
+            # yesterday's file
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_dir / "trading_claude.log", when='midnight', backupCount=14,
+                encoding='utf-8', delay=True
+            )
             file_handler.setLevel(logging.DEBUG)
             
         # Console handler  
@@ -184,45 +333,21 @@ class SistemaTradingClaudeAI:
     
     def _auto_detect_mt5_paths(self):
         """Auto-detect MT5 paths"""
-        home = Path.home()
-        
-        if platform.system() == "Darwin":  # macOS
-            possible_paths = [
-                home / "Library/Application Support/net.metaquotes.wine.metatrader5/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files",
-                home / ".wine/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files",
-                home / "Documents/MT5_Files",
-                home / "Desktop/MT5_Files"
-            ]
-        elif platform.system() == "Windows":
-            possible_paths = [
-                Path(os.environ.get('APPDATA', '')) / "MetaQuotes/Terminal/Common/Files",
-                home / "AppData/Roaming/MetaQuotes/Terminal/Common/Files",
-                Path("C:/Program Files/MetaTrader 5/MQL5/Files"),
-                Path("C:/Program Files (x86)/MetaTrader 5/MQL5/Files")
-            ]
-        else:  # Linux
-            possible_paths = [
-                home / ".wine/drive_c/users/user/AppData/Roaming/MetaQuotes/Terminal/Common/Files",
-                home / ".mt5/Files",
-                home / "Documents/MT5_Files"
-            ]
-        
-        mt5_dir = None
-        for path in possible_paths:
-            if path.exists():
-                mt5_dir = path
-                self.logger.info(f"✅ MT5 directory found: {mt5_dir}")
-                break
+        mt5_dir, found = _detect_mt5_dir(platform.system(), str(Path.home()))
         
-        if not mt5_dir:
-            mt5_dir = possible_paths[0]
+        if found:
+            self.logger.info(f"✅ MT5 directory found: {mt5_dir}")
+        else:
             self.logger.warning(f"⚠️ MT5 directory not found, will create: {mt5_dir}")
         
         self.mt5_commands_file = mt5_dir / "trading_commands.txt"
         self.mt5_status_file = mt5_dir / "trade_status.txt"
     
     def ensure_all_files_exist(self):
-        """Ensure all files exist"""
+        """Ensure all files exist (only checked once per process)"""
+        if self._mt5_ready:
+            return
+        
         try:
             # MT5 files
             self.mt5_commands_file.parent.mkdir(parents=True, exist_ok=True)
@@ -238,6 +363,7 @@ class SistemaTradingClaudeAI:
                     f.write(default_status)
                 self.logger.info(f"📁 Created MT5 status file")
             
+            self._mt5_ready = True
             self.logger.info("✅ All files validated")
             
         except Exception as e:
@@ -267,19 +393,7 @@ class SistemaTradingClaudeAI:
     
     def _import_trading_automation(self):
         """Import TradingView automation"""
-        import_attempts = [
-            ('trading_bot', 'TradingViewAutomation'),
-            ('Trading_bot', 'TradingViewAutomation'),
-            ('tradingview_automation', 'TradingViewAutomation')
-        ]
-        
-        for module_name, class_name in import_attempts:
-            try:
-                module = __import__(module_name, fromlist=[class_name])
-                return getattr(module, class_name)
-            except (ImportError, AttributeError):
-                continue
-        return None
+        return resolve_automation_class()
     
     def take_screenshots(self) -> Optional[Dict[str, str]]:
         """Take trading screenshots"""
@@ -319,21 +433,30 @@ class SistemaTradingClaudeAI:
         
         for key, filepath in screenshots.items():
             try:
-                path = Path(filepath)
-                if path.exists() and path.stat().st_size >= min_size:
+                # A single stat() answers both "exists" and "big enough"
+                if Path(filepath).stat().st_size >= min_size:
                     validated[key] = filepath
                 else:
-                    self.logger.warning(f"⚠️ Invalid screenshot: {key}")
+                    self.logger.warning("⚠️ Invalid screenshot: %s", key)
+            except FileNotFoundError:
+                self.logger.warning("⚠️ Invalid screenshot: %s", key)
             except Exception as e:
-                self.logger.error(f"❌ Screenshot validation error {key}: {e}")
+                self.logger.error("❌ Screenshot validation error %s: %s", key, e)
         
         return validated
     
+    def _get_formatted_memory(self) -> str:
+        """Formatted recent lessons, rebuilt only when memory has changed"""
+        if self._memory_cache is None or self._memory_version != self.memory.version:
+            recent_lessons = self.memory.get_recent_lessons(limit=10, min_relevance=4)
+            self._memory_cache = self.memory.format_memory_for_ai(recent_lessons)
+            self._memory_version = self.memory.version
+        return self._memory_cache
+    
     def get_memory_context(self) -> str:
         """Get memory context for Claude analysis"""
         try:
-            recent_lessons = self.memory.get_recent_lessons(limit=10, min_relevance=4)
-            memory_text = self.memory.format_memory_for_ai(recent_lessons)
+            memory_text = self._get_formatted_memory()
             
             # Add current context
             context_info = [
@@ -348,68 +471,123 @@ class SistemaTradingClaudeAI:
             self.logger.error(f"❌ Memory context error: {e}")
             return "MEMORIA: [Error cargando memoria]"
     
+    def is_trading_hours(self) -> bool:
+        """Check if current time is within configured trading hours"""
+        t = time.localtime()
+        now = t.tm_hour * 3600 + t.tm_min * 60 + t.tm_sec
+        return self._trading_start_sec <= now <= self._trading_end_sec
+    
     def send_command_to_mt5(self, command: str) -> bool:
         """Send command to MT5 EA"""
         try:
-            if command not in ['1', '2', '3', '4']:
-                self.logger.error(f"❌ Invalid MT5 command: {command}")
+            if command not in self._DECISION_NAMES:
+                self.logger.error("❌ Invalid MT5 command: %s", command)
                 return False
             
-            with open(self.mt5_commands_file, 'w', encoding='ascii') as f:
-                f.write(command)
-                f.flush()
-            
-            command_names = {'1': 'WAIT', '2': 'LONG', '3': 'SHORT', '4': 'CLOSE'}
-            self.logger.info(f"📤 MT5 command sent: {command_names[command]}")
-            
-            time.sleep(0.1)
+            try:
+                self._write_mt5_command(command)
+            except FileNotFoundError:
+                # MT5 directory vanished since startup; recreate it once and retry
+                self._mt5_ready = False
+                self.ensure_all_files_exist()
+                self._write_mt5_command(command)
+            
+            self.logger.info("📤 MT5 command sent: %s", self._DECISION_NAMES[command])
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ MT5 command error: {e}")
+            self.logger.error("❌ MT5 command error: %s", e)
             return False
     
-    def read_mt5_status(self) -> Dict[str, Any]:
+    def _write_mt5_command(self, command: str):
+        """Write command atomically so the EA never reads a partial write"""
+        temp_file = self.mt5_commands_file.with_suffix('.tmp')
+        fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            try:
+                os.write(fd, command.encode('ascii'))
+                # fsync can be turned off when the MT5 dir lives on tmpfs (testing)
+                if self.config["mt5"].get("fsync_commands", True):
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(temp_file, self.mt5_commands_file)
+        except OSError:
+            # Don't leave a stale temp file behind for the next write
+            temp_file.unlink(missing_ok=True)
+            raise
+    
+    def read_mt5_status(self) -> MT5Status:
         """Read MT5 status"""
         try:
-            if not self.mt5_status_file.exists():
-                return {'status': 'FILE_NOT_FOUND', 'message': 'Status file does not exist'}
+            try:
+                st = os.stat(self.mt5_status_file)
+            except FileNotFoundError:
+                return STATUS_FILE_NOT_FOUND
+            
+            # Skip parsing when the EA hasn't rewritten the file since last read
+            cache = self._status_cache
+            if cache and cache[0] == st.st_mtime_ns and cache[1] == st.st_size:
+                return cache[2]
             
-            for encoding in ['ascii', 'utf-8', 'latin1', 'cp1252']:
+            # Status is a single short line; bound the read
+            with open(self.mt5_status_file, 'rb') as f:
+                raw = f.read(512)
+            
+            status_data = self._parse_mt5_status(raw)
+            self._status_cache = (st.st_mtime_ns, st.st_size, status_data)
+            return status_data
+            
+        except Exception as e:
+            self.logger.error("❌ MT5 status read error: %s", e)
+            return MT5Status('ERROR', message=str(e))
+    
+    def _parse_mt5_status(self, raw: bytes) -> MT5Status:
+        """Parse the raw bytes of the MT5 status file"""
+        # The EA writes plain ASCII; only fall back to trial decoding otherwise
+        content = raw.decode('ascii').strip() if raw.isascii() else None
+        
+        if not content:
+            # ASCII was already ruled out above
+            for encoding in ['utf-8', 'latin1', 'cp1252']:
                 try:
-                    with open(self.mt5_status_file, 'r', encoding=encoding) as f:
-                        content = f.read().strip()
+                    content = raw.decode(encoding).strip()
                     
-                    if content and all(ord(c) < 128 for c in content):
+                    if content and content.isascii():
                         break
-                except:
+                except UnicodeDecodeError:
                     continue
             else:
-                return {'status': 'UNREADABLE', 'message': 'File contains unreadable data'}
-            
-            parts = content.split('|')
-            if len(parts) < 6:
-                return {'status': 'PARSE_ERROR', 'message': f'Invalid format: {content}'}
-            
-            status_data = {
-                'status': parts[0],
-                'ticket': int(parts[1]) if parts[1].isdigit() else 0,
-                'entry': self._safe_float_parse(parts[2]),
-                'sl': self._safe_float_parse(parts[3]),
-                'tp': self._safe_float_parse(parts[4]),
-                'timestamp': parts[5],
-                'message': parts[6] if len(parts) > 6 else "",
-                'raw_data': content
-            }
-            
-            status_data['is_active'] = status_data['status'] in ['LONG_ACTIVE', 'SHORT_ACTIVE']
-            status_data['direction'] = 'LONG' if 'LONG' in status_data['status'] else 'SHORT' if 'SHORT' in status_data['status'] else None
-            
-            return status_data
-            
-        except Exception as e:
-            self.logger.error(f"❌ MT5 status read error: {e}")
-            return {'status': 'ERROR', 'message': str(e)}
+                return STATUS_UNREADABLE
+        
+        parts = content.split('|', 6)
+        if len(parts) < 6:
+            return MT5Status('PARSE_ERROR', message=f'Invalid format: {content}')
+        
+        status, ticket, entry, sl, tp, timestamp = parts[:6]
+        try:
+            ticket = int(ticket)
+        except ValueError:
+            ticket = 0
+        
+        # Common case converts all prices in one go; per-field fallback on bad data
+        try:
+            entry, sl, tp = float(entry or 0), float(sl or 0), float(tp or 0)
+        except ValueError:
+            entry, sl, tp = (self._safe_float_parse(v) for v in (entry, sl, tp))
+        
+        return MT5Status(
+            status=status,
+            ticket=ticket,
+            entry=entry,
+            sl=sl,
+            tp=tp,
+            timestamp=timestamp,
+            message=parts[6] if len(parts) > 6 else "",
+            is_active=status in ['LONG_ACTIVE', 'SHORT_ACTIVE'],
+            direction='LONG' if 'LONG' in status else 'SHORT' if 'SHORT' in status else None,
+            raw_data=content
+        )
     
     def _safe_float_parse(self, value: str) -> float:
         """Safely parse float"""
@@ -421,12 +599,17 @@ class SistemaTradingClaudeAI:
     def daily_trading_session(self):
         """MAIN AUTOMATED TRADING SESSION WITH CLAUDE AI"""
         session_start = datetime.now()
+        # Duration from the monotonic clock: cheap and immune to wall-clock jumps
+        session_t0 = time.monotonic()
         self.logger.info("🚀 ===== DAILY TRADING SESSION WITH CLAUDE AI =====")
-        self.logger.info(f"⏰ Time: {session_start.strftime('%Y-%m-%d %H:%M:%S')}")
+        self.logger.info("⏰ Time: %s", session_start.strftime('%Y-%m-%d %H:%M:%S'))
         
         self.session_active = True
         
         try:
+            # No-op unless a watcher saw the MT5 files disappear
+            self.ensure_all_files_exist()
+            
             # Step 1: Take screenshots
             self.logger.info("📸 Step 1: Capturing market screenshots...")
             screenshots = self.take_screenshots()
@@ -455,9 +638,9 @@ class SistemaTradingClaudeAI:
             reasoning = claude_decision.get("reasoning", "No reasoning provided")
             confidence = claude_decision.get("confidence", 0)
             
-            self.logger.info(f"🎯 Claude Decision: {decision}")
-            self.logger.info(f"🧠 Reasoning: {reasoning}")
-            self.logger.info(f"📊 Confidence: {confidence}/10")
+            self.logger.info("🎯 Claude Decision: %s", decision)
+            self.logger.info("🧠 Reasoning: %s", reasoning)
+            self.logger.info("📊 Confidence: %s/10", confidence)
             
             # Step 5: Execute decision
             success = self.execute_trading_decision(decision, reasoning)
@@ -471,48 +654,52 @@ class SistemaTradingClaudeAI:
                 self._start_trade_monitoring()
             
             # Session summary
-            session_duration = (datetime.now() - session_start).total_seconds()
+            session_duration = time.monotonic() - session_t0
             self.logger.info("📊 ===== SESSION SUMMARY =====")
-            self.logger.info(f"⏱️ Duration: {session_duration:.1f} seconds")
-            self.logger.info(f"📸 Screenshots: {len(screenshots)}")
-            self.logger.info(f"🤖 Claude Decision: {decision} (confidence: {confidence}/10)")
-            self.logger.info(f"✅ Execution: {'Success' if success else 'Failed'}")
+            self.logger.info("⏱️ Duration: %.1f seconds", session_duration)
+            self.logger.info("📸 Screenshots: %d", len(screenshots))
+            self.logger.info("🤖 Claude Decision: %s (confidence: %s/10)", decision, confidence)
+            self.logger.info("✅ Execution: %s", 'Success' if success else 'Failed')
             self.logger.info("=" * 50)
             
         except Exception as e:
-            self.logger.error(f"❌ Daily session error: {e}")
+            self.logger.error("❌ Daily session error: %s", e)
         finally:
             self.session_active = False
     
     def execute_trading_decision(self, decision: str, reasoning: str) -> bool:
         """Execute trading decision"""
-        self.logger.info(f"📊 Executing decision: {decision}")
-        self.logger.info(f"💭 Claude reasoning: {reasoning}")
+        self.logger.info("📊 Executing decision: %s", decision)
+        self.logger.info("💭 Claude reasoning: %s", reasoning)
         
         if self.send_command_to_mt5(decision):
-            decision_names = {'1': 'WAIT', '2': 'LONG', '3': 'SHORT', '4': 'CLOSE'}
-            action_name = decision_names[decision]
+            action_name = self._DECISION_NAMES[decision]
             
             if decision in ['2', '3']:
                 self.current_trade = action_name
-                self.logger.info(f"✅ {action_name} trade executed")
+                self.logger.info("✅ %s trade executed", action_name)
             elif decision == '1':
-                self.logger.info(f"⏳ Waiting for better conditions")
+                self.logger.info("⏳ Waiting for better conditions")
             elif decision == '4':
                 self.current_trade = None
-                self.logger.info(f"🛑 All positions closed")
+                self.logger.info("🛑 All positions closed")
             
             return True
         else:
-            self.logger.error(f"❌ Failed to execute {decision}")
+            self.logger.error("❌ Failed to execute %s", decision)
             return False
     
     def _start_trade_monitoring(self):
         """Start trade monitoring in background"""
+        # An active status watcher checks the trade on every MT5 write, backed by
+        # the periodic monitoring_session job; fast polling is only needed without it
+        if self.status_observer:
+            return
+        
         def monitor_trade():
             self.logger.info("👁️ Trade monitoring started...")
             
-            while self.current_trade and not self.shutdown_requested:
+            while self.current_trade and not self.shutdown_requested and not self.status_observer:
                 try:
                     if self.monitor_active_trade():
                         self.logger.info("✅ Trade monitoring completed - trade closed")
@@ -521,7 +708,7 @@ class SistemaTradingClaudeAI:
                     time.sleep(self.config["mt5"]["status_check_interval"])
                     
                 except Exception as e:
-                    self.logger.error(f"❌ Trade monitoring error: {e}")
+                    self.logger.error("❌ Trade monitoring error: %s", e)
                     break
         
         monitor_thread = threading.Thread(target=monitor_trade)
@@ -530,31 +717,37 @@ class SistemaTradingClaudeAI:
     
     def monitor_active_trade(self) -> bool:
         """Monitor active trade"""
-        status = self.read_mt5_status()
-        
-        if status['status'] in ['TP_HIT', 'SL_HIT', 'CLOSED', 'MANUAL_CLOSE']:
-            self.logger.info(f"🚨 TRADE CLOSED: {status['status']}")
+        with self._monitor_lock:
+            # Another thread may have closed the trade while we waited
+            if not self.current_trade:
+                return False
             
-            if status.get('entry', 0) > 0:
-                self.logger.info(f"📈 Entry: {status['entry']}")
-                if status.get('sl'): self.logger.info(f"🛑 SL: {status['sl']}")
-                if status.get('tp'): self.logger.info(f"🎯 TP: {status['tp']}")
+            status = self.read_mt5_status()
             
-            # Generate lesson
-            self.generate_post_trade_lesson(status)
+            if status.status in ['TP_HIT', 'SL_HIT', 'CLOSED', 'MANUAL_CLOSE']:
+                self.logger.info("🚨 TRADE CLOSED: %s", status.status)
+                
+                if status.entry > 0:
+                    self.logger.info("📈 Entry: %s", status.entry)
+                    if status.sl: self.logger.info("🛑 SL: %s", status.sl)
+                    if status.tp: self.logger.info("🎯 TP: %s", status.tp)
+                
+                # Clear the trade before queueing so the close is handled exactly once
+                self.current_trade = None
+                
+                # Generate lesson without blocking further status polls
+                self._post_trade_pool.submit(self.generate_post_trade_lesson, status)
+                return True
+            
+            elif status.status in ['LONG_ACTIVE', 'SHORT_ACTIVE']:
+                direction = status.direction or 'UNKNOWN'
+                entry = status.entry
+                self.logger.info("📈 Active %s trade @ %s", direction, entry)
+                return False
             
-            self.current_trade = None
-            return True
-        
-        elif status['status'] in ['LONG_ACTIVE', 'SHORT_ACTIVE']:
-            direction = status.get('direction', 'UNKNOWN')
-            entry = status.get('entry', 0)
-            self.logger.info(f"📈 Active {direction} trade @ {entry}")
             return False
-        
-        return False
     
-    def generate_post_trade_lesson(self, trade_result: Dict[str, Any]):
+    def generate_post_trade_lesson(self, trade_result: MT5Status):
         """Generate post-trade lesson"""
         self.logger.info("🧠 Generating post-trade lesson...")
         
@@ -563,15 +756,15 @@ class SistemaTradingClaudeAI:
         
         # Create basic lesson
         try:
-            context = f"{trade_result.get('direction', 'Unknown')} trade - {trade_result['status']}"
-            rule = f"Trade closed: {trade_result['status']} - Review execution and Claude analysis"
+            context = f"{trade_result.direction or 'Unknown'} trade - {trade_result.status}"
+            rule = f"Trade closed: {trade_result.status} - Review execution and Claude analysis"
             
             auto_tags = []
-            if trade_result.get('direction'): 
-                auto_tags.append(trade_result['direction'].lower())
-            if 'TP_HIT' in trade_result['status']: 
+            if trade_result.direction: 
+                auto_tags.append(trade_result.direction.lower())
+            if 'TP_HIT' in trade_result.status: 
                 auto_tags.append('win')
-            elif 'SL_HIT' in trade_result['status']: 
+            elif 'SL_HIT' in trade_result.status: 
                 auto_tags.append('loss')
             auto_tags.extend(['post_trade', 'claude_decision'])
             
@@ -590,28 +783,18 @@ class SistemaTradingClaudeAI:
         except Exception as e:
             self.logger.error(f"❌ Post-trade lesson error: {e}")
     
-    def _calculate_pips_result(self, trade_data: Dict) -> str:
+    def _calculate_pips_result(self, trade_data: MT5Status) -> str:
         """Calculate pips result"""
-        if trade_data.get('entry', 0) <= 0:
+        if trade_data.status not in ('TP_HIT', 'SL_HIT') or trade_data.entry <= 0:
             return "N/A"
         
-        try:
-            if trade_data['status'] == 'TP_HIT' and trade_data.get('tp', 0) > 0:
-                if trade_data.get('direction') == 'LONG':
-                    pips = (trade_data['tp'] - trade_data['entry']) * 10000
-                else:
-                    pips = (trade_data['entry'] - trade_data['tp']) * 10000
-                return f"+{pips:.1f} pips"
-            elif trade_data['status'] == 'SL_HIT' and trade_data.get('sl', 0) > 0:
-                if trade_data.get('direction') == 'LONG':
-                    pips = (trade_data['sl'] - trade_data['entry']) * 10000
-                else:
-                    pips = (trade_data['entry'] - trade_data['sl']) * 10000
-                return f"{pips:.1f} pips"
-        except:
-            pass
+        sign = 1 if trade_data.direction == 'LONG' else -1
+        target = trade_data.tp if trade_data.status == 'TP_HIT' else trade_data.sl
+        if target <= 0:
+            return "N/A"
         
-        return "N/A"
+        pips = sign * (target - trade_data.entry) * 10000
+        return f"{pips:+.1f} pips"
     
     def start_automated_system(self):
         """Start the fully automated Claude AI trading system"""
@@ -621,12 +804,17 @@ class SistemaTradingClaudeAI:
         self.logger.info(f"👁️ Monitoring: Every {self.config['trading']['monitoring_interval']} minutes")
         self.logger.info(f"⏰ Trading hours: {self.config['trading']['trading_hours']['start']}-{self.config['trading']['trading_hours']['end']}")
         
-        # Schedule sessions
+        # Schedule sessions as precomputed wake-up times: (next_ts, seq, job, interval)
         daily_time = self.config["trading"]["daily_session_time"]
-        schedule.every().day.at(daily_time).do(self.daily_trading_session)
+        jobs = [(next_daily_run(daily_time), 0, self.daily_trading_session, None)]
+        
+        # Prefer file events for monitoring; the periodic pass stays as a coarse
+        # fallback for missed or coalesced events (network shares, dead watcher)
+        self.status_observer = self._start_status_watcher()
+        monitor_seconds = self.config["trading"]["monitoring_interval"] * 60
+        jobs.append((time.time() + monitor_seconds, 1, self.monitoring_session, monitor_seconds))
         
-        monitor_interval = self.config["trading"]["monitoring_interval"]
-        schedule.every(monitor_interval).minutes.do(self.monitoring_session)
+        heapq.heapify(jobs)
         
         self.logger.info("")
         self.logger.info("🎯 MANUAL COMMANDS:")
@@ -640,16 +828,42 @@ class SistemaTradingClaudeAI:
         
         self.is_running = True
         
+        # Signals write to this pipe so select() below can sleep until the next job
+        # and still notice shutdown requests at once (POSIX; Windows keeps a 1s tick)
+        wake_r = wake_w = None
+        old_wakeup_fd = -1
+        try:
+            wake_r, wake_w = os.pipe()
+            os.set_blocking(wake_w, False)
+            old_wakeup_fd = signal.set_wakeup_fd(wake_w)
+        except (OSError, ValueError):
+            for fd in (wake_r, wake_w):
+                if fd is not None:
+                    os.close(fd)
+            wake_r = wake_w = None
+        watched = [sys.stdin] if wake_r is None else [sys.stdin, wake_r]
+        
         # Interactive loop
         try:
             while self.is_running and not self.shutdown_requested:
-                schedule.run_pending()
+                next_ts, seq, job, interval = jobs[0]
+                now = time.time()
+                
+                if now >= next_ts:
+                    # Daily jobs are recomputed from the clock; interval jobs rerun after a fixed delay
+                    next_ts = now + interval if interval else next_daily_run(daily_time, now)
+                    heapq.heapreplace(jobs, (next_ts, seq, job, interval))
+                    job()
+                    continue
+                
+                # Wait for input, but never past the next due job
+                wait = next_ts - now if wake_r is not None else min(1, next_ts - now)
                 
                 try:
-                    import select
-                    import sys
-                    
-                    if select.select([sys.stdin], [], [], 1) == ([sys.stdin], [], []):
+                    readable, _, _ = select.select(watched, [], [], wait)
+                    if wake_r in readable:
+                        os.read(wake_r, 512)
+                    if sys.stdin in readable:
                         user_input = input().strip().lower()
                         
                         if user_input == 'test':
@@ -660,37 +874,67 @@ class SistemaTradingClaudeAI:
                         elif user_input in ['quit', 'exit', 'stop']:
                             self.logger.info("🛑 Manual shutdown requested")
                             break
-                    else:
-                        time.sleep(1)
                         
-                except (ImportError, OSError):
-                    time.sleep(60)
+                except OSError:
+                    time.sleep(min(60, next_ts - now))
                     
         except KeyboardInterrupt:
             self.logger.info("🛑 Keyboard interrupt received")
         finally:
+            if wake_r is not None:
+                signal.set_wakeup_fd(old_wakeup_fd)
+                os.close(wake_r)
+                os.close(wake_w)
             self._graceful_shutdown()
     
+    def _start_status_watcher(self):
+        """Watch the MT5 status file and monitor trades on change"""
+        # kqueue (macOS/BSD) delivers vnode events straight from the kernel
+        if hasattr(select, 'kqueue'):
+            try:
+                watcher = KqueueStatusWatcher(self)
+                watcher.start()
+                self.logger.info("👁️ Watching MT5 status file via kqueue")
+                return watcher
+            except Exception as e:
+                self.logger.error(f"❌ kqueue watcher error: {e}")
+        
+        if Observer is None:
+            self.logger.info("ℹ️ watchdog not installed, using periodic monitoring")
+            return None
+        
+        try:
+            observer = Observer()
+            observer.schedule(MT5StatusHandler(self), str(self.mt5_status_file.parent), recursive=False)
+            observer.daemon = True
+            observer.start()
+            self.logger.info("👁️ Watching MT5 status file for changes")
+            return observer
+        except Exception as e:
+            self.logger.error(f"❌ Status watcher error: {e}")
+            return None
+    
     def monitoring_session(self):
         """Monitoring session during trading hours"""
+        # Idle ticks (no open trade) return before any clock read or logging
         if not self.current_trade:
             return
         
         try:
-            self.logger.info(f"👁️ Monitoring session - {datetime.now().strftime('%H:%M:%S')}")
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("👁️ Monitoring session - %s", datetime.now().strftime('%H:%M:%S'))
             
-            if self.current_trade:
-                trade_closed = self.monitor_active_trade()
-                if trade_closed:
-                    self.logger.info("✅ Trade closed during monitoring")
+            if self.monitor_active_trade():
+                self.logger.info("✅ Trade closed during monitoring")
                     
         except Exception as e:
-            self.logger.error(f"❌ Monitoring session error: {e}")
+            self.logger.error("❌ Monitoring session error: %s", e)
     
     def _print_system_status(self):
         """Print system status"""
         mt5_status = self.read_mt5_status()
-        memory_stats = self.memory.get_memory_stats()
+        # Only the count is shown; full stats would re-scan every lesson
+        lesson_count = self.memory.lesson_count()
         
         self.logger.info("📊 ===== SYSTEM STATUS =====")
         self.logger.info(f"🕐 Current Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -698,8 +942,9 @@ class SistemaTradingClaudeAI:
         self.logger.info(f"🤖 Claude AI: ACTIVE")
         self.logger.info(f"📈 Current Trade: {self.current_trade or 'None'}")
         self.logger.info(f"🔍 Session Active: {self.session_active}")
-        self.logger.info(f"🤖 MT5 Status: {mt5_status.get('status', 'Unknown')}")
-        self.logger.info(f"🧠 Memory Lessons: {memory_stats.get('total', 0)}")
+        self.logger.info(f"⏰ Trading Hours: {'Yes' if self.is_trading_hours() else 'No'}")
+        self.logger.info(f"🤖 MT5 Status: {mt5_status.status}")
+        self.logger.info(f"🧠 Memory Lessons: {lesson_count}")
         self.logger.info("==========================")
     
     def _graceful_shutdown(self):
@@ -709,6 +954,13 @@ class SistemaTradingClaudeAI:
         self.is_running = False
         self.session_active = False
         
+        if self.status_observer:
+            self.status_observer.stop()
+            self.status_observer = None
+        
+        # Let pending post-trade lessons land before the final backup
+        self._post_trade_pool.shutdown(wait=True)
+        
         if self.current_trade:
             self.logger.info("🛑 Closing active trades...")
             self.send_command_to_mt5('4')
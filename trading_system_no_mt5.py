@@ -5,26 +5,64 @@ Solo análisis y memoria, sin comunicación MT5 hasta resolver encoding
 """
 
 import time
-import schedule
+import asyncio
 from datetime import datetime, time as dt_time
 import os
 import sys
 import platform
 import logging
+import logging.handlers
 from pathlib import Path
 from typing import Dict, Optional, List, Any
+from types import MappingProxyType
 import json
 import signal
 from contextlib import contextmanager
 
 # Import our enhanced components
 try:
-    from local_memory_system import LocalTradingMemory
+    from local_memory_system import LocalTradingMemory, configure_logging as configure_memory_logging
+    from automation_loader import resolve_automation_class
+    from trading_common import load_config, next_daily_run
 except ImportError:
-    print("❌ Error: local_memory_system.py no encontrado")
+    print("❌ Error: local_memory_system.py, automation_loader.py o trading_common.py no encontrado")
     sys.exit(1)
 
+# Built once; _load_config deep-copies it before merging the user file
+DEFAULT_CONFIG = MappingProxyType({
+    "trading": {
+        "pairs": ["EURUSD"],
+        "timeframes": ["H4", "H1", "M15"],
+        "daily_session_time": "13:00",
+        "monitoring_interval": 15,
+        "trading_hours": {
+            "start": "14:00",
+            "end": "17:00"
+        },
+        "max_retries": 3
+    },
+    "directories": {
+        "screenshots": "trading_screenshots",
+        "logs": "logs",
+        "backups": "backups"
+    },
+    "automation": {
+        "screenshot_validation": True,
+        "auto_backup": True,
+        "error_recovery": True,
+        "headless_mode": False
+    },
+    "notifications": {
+        "log_level": "INFO",
+        "file_logging": True,
+        "console_logging": True
+    }
+})
+
 class SistemaTradingSinMT5:
+    # Decision/command codes shared by the EA protocol and the prompts
+    _DECISION_NAMES = {'1': 'WAIT', '2': 'LONG', '3': 'SHORT', '4': 'CLOSE'}
+    
     def __init__(self, config_file: str = "trading_system_config.json"):
         """Initialize trading system without MT5 communication"""
         self.config_file = Path(config_file)
@@ -34,6 +72,7 @@ class SistemaTradingSinMT5:
         self._setup_logging()
         
         # Initialize components
+        configure_memory_logging()
         self.memory = LocalTradingMemory()
         self.screenshots_dir = Path(self.config["directories"]["screenshots"])
         
@@ -46,65 +85,16 @@ class SistemaTradingSinMT5:
         # Track decisions for logging
         self.decisions_log = []
         
+        # Formatted memory, invalidated by LocalTradingMemory.version
+        self._memory_cache = None
+        self._memory_version = -1
+        
         self.logger.info("Sistema de Trading IA inicializado (SIN MT5)")
         self.logger.info("🚫 MT5 communication disabled - Analysis only mode")
     
     def _load_config(self) -> Dict[str, Any]:
         """Load configuration"""
-        default_config = {
-            "trading": {
-                "pairs": ["EURUSD"],
-                "timeframes": ["H4", "H1", "M15"],
-                "daily_session_time": "13:00",
-                "monitoring_interval": 15,
-                "trading_hours": {
-                    "start": "14:00",
-                    "end": "17:00"
-                },
-                "max_retries": 3
-            },
-            "directories": {
-                "screenshots": "trading_screenshots",
-                "logs": "logs",
-                "backups": "backups"
-            },
-            "automation": {
-                "screenshot_validation": True,
-                "auto_backup": True,
-                "error_recovery": True,
-                "headless_mode": False
-            },
-            "notifications": {
-                "log_level": "INFO",
-                "file_logging": True,
-                "console_logging": True
-            }
-        }
-        
-        try:
-            if self.config_file.exists():
-                with open(self.config_file, 'r') as f:
-                    loaded_config = json.load(f)
-                
-                self._merge_config(default_config, loaded_config)
-                return default_config
-            else:
-                with open(self.config_file, 'w') as f:
-                    json.dump(default_config, f, indent=2)
-                return default_config
-                
-        except Exception as e:
-            print(f"Error loading config: {e}, using defaults")
-            return default_config
-    
-    def _merge_config(self, default: Dict, loaded: Dict):
-        """Recursively merge loaded config with defaults"""
-        for key, value in loaded.items():
-            if key in default:
-                if isinstance(default[key], dict) and isinstance(value, dict):
-                    self._merge_config(default[key], value)
-                else:
-                    default[key] = value
+        return load_config(self.config_file, DEFAULT_CONFIG)
     
     def _setup_logging(self):
         """Setup logging system"""
@@ -117,8 +107,12 @@ class SistemaTradingSinMT5:
         self.logger.handlers.clear()
         
         if self.config["notifications"]["file_logging"]:
-            log_file = log_dir / f"trading_system_no_mt5_{datetime.now().strftime('%Y%m%d')}.log"
-            file_handler = logging.FileHandler(log_file)
+            # Rotate at midnight so long-running processes don't keep writing to
+            # yesterday's file
+            file_handler = logging.handlers.TimedRotatingFileHandler(
+                log_dir / "trading_system_no_mt5.log", when='midnight', backupCount=14,
+                encoding='utf-8', delay=True
+            )
             file_handler.setLevel(logging.DEBUG)
             
         if self.config["notifications"]["console_logging"]:
@@ -161,24 +155,10 @@ class SistemaTradingSinMT5:
     
     def _import_trading_automation(self):
         """Import TradingView automation"""
-        import_attempts = [
-            ('trading_bot', 'TradingViewAutomation'),
-            ('Trading_bot', 'TradingViewAutomation'),
-            ('tradingview_automation', 'TradingViewAutomation')
-        ]
-        
-        for module_name, class_name in import_attempts:
-            try:
-                module = __import__(module_name, fromlist=[class_name])
-                automation_class = getattr(module, class_name)
-                self.logger.info(f"Successfully imported {module_name}.{class_name}")
-                return automation_class
-            except (ImportError, AttributeError) as e:
-                self.logger.debug(f"Failed to import {module_name}.{class_name}: {e}")
-                continue
-        
-        self.logger.error("All automation import attempts failed")
-        return None
+        automation_class = resolve_automation_class()
+        if automation_class is None:
+            self.logger.error("All automation import attempts failed")
+        return automation_class
     
     def take_screenshots(self) -> Optional[Dict[str, str]]:
         """Take screenshots using automation"""
@@ -207,11 +187,18 @@ class SistemaTradingSinMT5:
             self.logger.error(f"❌ Error tomando capturas: {e}")
             return None
     
+    def _get_formatted_memory(self) -> str:
+        """Formatted recent lessons, rebuilt only when memory has changed"""
+        if self._memory_cache is None or self._memory_version != self.memory.version:
+            recent_lessons = self.memory.get_recent_lessons(limit=10, min_relevance=4)
+            self._memory_cache = self.memory.format_memory_for_ai(recent_lessons)
+            self._memory_version = self.memory.version
+        return self._memory_cache
+    
     def get_memory_for_analysis(self) -> str:
         """Get recent memory for AI analysis"""
         try:
-            recent_lessons = self.memory.get_recent_lessons(limit=10, min_relevance=4)
-            memory_text = self.memory.format_memory_for_ai(recent_lessons)
+            memory_text = self._get_formatted_memory()
             
             context_info = [
                 f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
@@ -265,9 +252,8 @@ class SistemaTradingSinMT5:
             try:
                 decision = input(f"\n🔥 TU DECISIÓN (1-4) [Intento {attempt + 1}/{max_attempts}]: ").strip()
                 
-                if decision in ['1', '2', '3', '4']:
-                    decision_names = {'1': 'WAIT', '2': 'LONG', '3': 'SHORT', '4': 'CLOSE'}
-                    print(f"✅ Decisión confirmada: {decision_names[decision]}")
+                if decision in self._DECISION_NAMES:
+                    print(f"✅ Decisión confirmada: {self._DECISION_NAMES[decision]}")
                     return decision
                 else:
                     print("❌ Por favor ingresa solo: 1 (WAIT), 2 (LONG), 3 (SHORT), o 4 (CLOSE)")
@@ -286,18 +272,11 @@ class SistemaTradingSinMT5:
     def log_trading_decision(self, decision: str) -> bool:
         """Log trading decision instead of sending to MT5"""
         try:
-            decision_map = {
-                '1': 'WAIT',
-                '2': 'LONG', 
-                '3': 'SHORT',
-                '4': 'CLOSE'
-            }
-            
-            if decision not in decision_map:
+            action_name = self._DECISION_NAMES.get(decision)
+            if action_name is None:
                 self.logger.error(f"Decisión inválida: {decision}")
                 return False
-            
-            action_name = decision_map[decision]
+
             timestamp = datetime.now().isoformat()
             
             # Log decision
@@ -345,45 +324,47 @@ class SistemaTradingSinMT5:
             self.logger.error(f"❌ Error registrando decisión: {e}")
             return False
     
-    def daily_trading_session(self):
+    async def daily_trading_session(self):
         """Daily trading session without MT5"""
         session_start = datetime.now()
-        self.logger.info(f"\n🚀 SESIÓN DE TRADING DIARIA (SIN MT5) - {session_start.strftime('%Y-%m-%d %H:%M:%S')}")
+        # Duration from the monotonic clock: cheap and immune to wall-clock jumps
+        session_t0 = time.monotonic()
+        self.logger.info("\n🚀 SESIÓN DE TRADING DIARIA (SIN MT5) - %s", session_start.strftime('%Y-%m-%d %H:%M:%S'))
         self.logger.info("="*60)
         
         try:
-            # Step 1: Take screenshots
+            # Steps 1-2: screenshots and memory are independent, so load them concurrently
             self.logger.info("Paso 1: Capturando screenshots...")
-            screenshots = self.take_screenshots()
+            self.logger.info("Paso 2: Cargando memoria...")
+            screenshots, memory_text = await asyncio.gather(
+                asyncio.to_thread(self.take_screenshots),
+                asyncio.to_thread(self.get_memory_for_analysis)
+            )
             
             if not screenshots:
                 self.logger.error("❌ No se pudieron tomar capturas - cancelando sesión")
                 return
             
-            # Step 2: Get memory context
-            self.logger.info("Paso 2: Cargando memoria...")
-            memory_text = self.get_memory_for_analysis()
-            
             # Step 3: Manual analysis
             self.logger.info("Paso 3: Análisis manual...")
             decision = self.manual_analysis_prompt(screenshots, memory_text)
             
             # Step 4: Log decision (instead of sending to MT5)
-            self.logger.info(f"Paso 4: Registrando decisión: {decision}")
+            self.logger.info("Paso 4: Registrando decisión: %s", decision)
             success = self.log_trading_decision(decision)
             
             # Session summary
-            session_duration = (datetime.now() - session_start).total_seconds()
-            self.logger.info(f"\n📊 RESUMEN DE SESIÓN:")
-            self.logger.info(f"Duración: {session_duration:.1f} segundos")
-            self.logger.info(f"Screenshots: {len(screenshots)}")
-            self.logger.info(f"Decisión: {decision}")
-            self.logger.info(f"Registro: {'✅ Exitoso' if success else '❌ Falló'}")
+            session_duration = time.monotonic() - session_t0
+            self.logger.info("\n📊 RESUMEN DE SESIÓN:")
+            self.logger.info("Duración: %.1f segundos", session_duration)
+            self.logger.info("Screenshots: %d", len(screenshots))
+            self.logger.info("Decisión: %s", decision)
+            self.logger.info("Registro: %s", '✅ Exitoso' if success else '❌ Falló')
             
             print(f"\n✅ Sesión completada - Decisión registrada en trading_decisions_log.json")
             
         except Exception as e:
-            self.logger.error(f"Error en sesión de trading: {e}")
+            self.logger.error("Error en sesión de trading: %s", e)
             self.logger.exception("Stack trace:")
     
     def start_scheduler(self):
@@ -391,7 +372,6 @@ class SistemaTradingSinMT5:
         self.logger.info("⏰ Iniciando scheduler de trading (SIN MT5)...")
         
         daily_time = self.config["trading"]["daily_session_time"]
-        schedule.every().day.at(daily_time).do(self.daily_trading_session)
         
         self.logger.info("📅 Sesiones programadas:")
         self.logger.info(f"  - Análisis principal: {daily_time}")
@@ -399,20 +379,53 @@ class SistemaTradingSinMT5:
         
         # Test run
         if input("\n🧪 ¿Ejecutar sesión de prueba? (y/N): ").lower().strip() == 'y':
-            self.daily_trading_session()
+            asyncio.run(self.daily_trading_session())
         
         self.logger.info("\n⏰ Scheduler activo - Presiona Ctrl+C para detener")
         self.is_running = True
         
         try:
-            while self.is_running and not self.shutdown_requested:
-                schedule.run_pending()
-                time.sleep(60)
+            asyncio.run(self._scheduler_main())
         except KeyboardInterrupt:
             self.logger.info("Shutdown signal received")
         finally:
             self._graceful_shutdown()
     
+    async def _scheduler_main(self):
+        """Run scheduled jobs as tasks until shutdown is requested"""
+        self._shutdown_event = asyncio.Event()
+        # A Python-level handler, not loop.add_signal_handler(): it also runs while
+        # the manual prompt blocks the loop thread in input()
+        previous_handler = signal.signal(signal.SIGTERM, self._handle_sigterm)
+        
+        tasks = [asyncio.create_task(self._daily_task())]
+        try:
+            await self._shutdown_event.wait()
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _handle_sigterm(self, signum, frame):
+        """Stop the scheduler; handled like Ctrl+C, so a pending prompt defaults to WAIT"""
+        self.shutdown_requested = True
+        self.is_running = False
+        self._shutdown_event.set()
+        raise KeyboardInterrupt
+    
+    async def _daily_task(self):
+        """Wait for each daily session time and run the session"""
+        daily_time = self.config["trading"]["daily_session_time"]
+        while self.is_running:
+            next_run = next_daily_run(daily_time)
+            # Re-check the wall clock in case the machine slept through the wait
+            while time.time() < next_run:
+                await asyncio.sleep(next_run - time.time())
+            
+            # The interactive prompt stays on the main thread so Ctrl+C and SIGTERM reach input()
+            await self.daily_trading_session()
+    
     def _graceful_shutdown(self):
         """Perform graceful shutdown"""
         self.logger.info("🛑 Iniciando apagado graceful del sistema...")